@@ -1,11 +1,43 @@
-import json, os, streamlit as st
-from openai import AzureOpenAI
+import os, uuid, streamlit as st
 
 from src.tools import StreamlitTools, GeneralTools
-from src.mas import MAS_orchestrator
+from src.mas import DEFAULT_MAX_STEPS, MAS_orchestrator
+from src.sinks import JsonlSink, StreamlitSink, TeeSink
+from src.clients import azure_client
+from src.mock_llm import MockClient
+from src.resilience import rate_limiter_for
+from src.scheduler import scheduler_for
+from src.memory import MemoryManager
+from src.memory_store import DEFAULT_STORE_PATH, LongTermStore
+from src.checkpoints import BUDGET_STOPPED, COMPLETED, DEFAULT_CHECKPOINT_PATH, CheckpointSink, CheckpointStore, resumable
+from src.jobs import FAILED, FINISHED, follow_job, job_registry
+from src.cache import CACHE_MODES, DEFAULT_CACHE_PATH, CachedClient, ResponseCache
 import src.pydantic_models as pydantic_models
 import src.templates as templates
 
+
+# The sqlite stores and the telemetry file are opened once per process and shared by every session, rerun and run
+# (they lock their own access), instead of leaving a new connection or file handle behind on every rerun
+@st.cache_resource
+def open_response_cache(path):
+    return ResponseCache(path)
+
+
+@st.cache_resource
+def open_memory_store(path):
+    return LongTermStore(path)
+
+
+@st.cache_resource
+def open_checkpoints(path):
+    return CheckpointStore(path)
+
+
+@st.cache_resource
+def open_telemetry_sink(path):
+    return JsonlSink(path)
+
+
 # Render the top bar
 sidebar_placeholder = st.sidebar.empty() 
 
@@ -18,21 +50,26 @@ with config_container:
     endpoint = st.text_input("Endpoint URL", placeholder="https://your-endpoint.openai.azure.com/", key="endpoint_url")  
     deployment_name = st.text_input("Model Name", value="gpt-4o-global", key="model_name")  
     use_environment_key = st.checkbox("Use Environment Key", key="use_environment_key", value=True) 
-    client = AzureOpenAI(
-            azure_endpoint=endpoint,
-            azure_deployment=deployment_name,
-            api_key=api_key,
-            api_version="2024-08-01-preview"
-        )    
-  
-    # API Key Input or Use Environment Key (.env file)
-    if use_environment_key:  
-        client = AzureOpenAI(
-            azure_endpoint=os.getenv('AZURE_OPENAI_ENDPOINT'),
-            api_key=os.getenv('AZURE_OPENAI_KEY'),
-            azure_deployment=os.getenv('AZURE_OPENAI_MODEL'),
-            api_version="2024-08-01-preview"
-        ) 
+    fused_step = st.checkbox("Fused Step Mode", key="fused_step", value=False, help="Select the subtask, run the agent and update the plan in a single call per step")
+    stream_messages = st.checkbox("Stream Agent Messages", key="stream_messages", value=True)
+    plan_delta = st.checkbox("Plan Delta Mode", key="plan_delta", value=False, help="The conductor returns only the changed parts of the plan each step")
+    parallel_subtasks = st.checkbox("Parallel Subtasks", key="parallel_subtasks", value=False, help="The planner declares subtask dependencies and every subtask whose dependencies are met runs at the same time")
+    local_scheduler = st.checkbox("Local Scheduler", key="local_scheduler", value=False, help="Pick the next subtask from the plan and fill its agent input from a template, so each step is a single agent call")
+    pipelined = st.checkbox("Pipelined Execution", key="pipelined", value=False, help="Render agent messages while the next conductor call is running")
+    use_mock_llm = st.checkbox("Offline Mock LLM", key="use_mock_llm", value=False, help="Run against a local stand-in that returns synthetic plans and messages, no endpoint needed")
+    use_memory_store = st.checkbox("Persistent Long-Term Memory", key="use_memory_store", value=False, help="Save completed plans and their lessons locally and give the planner the most relevant ones from earlier runs")
+    cache_mode = st.selectbox("Response Cache", CACHE_MODES, index=0, key="cache_mode", help="record: reuse stored responses and store new ones, replay: stored responses only (offline)")
+    # API Key Input or Use Environment Key (.env file). The client and its connection pool are shared across
+    # reruns and sessions, see src/clients.py
+    if use_mock_llm:
+        client = MockClient(latency=0.5, tokens_per_second=80)
+    elif use_environment_key:
+        client = azure_client(os.getenv('AZURE_OPENAI_ENDPOINT'), os.getenv('AZURE_OPENAI_MODEL'), os.getenv('AZURE_OPENAI_KEY'))
+    else:
+        client = azure_client(endpoint, deployment_name, api_key)
+
+    if cache_mode != "off":
+        client = CachedClient(client, open_response_cache(os.getenv('MAS_CACHE_PATH', DEFAULT_CACHE_PATH)), mode=cache_mode)
 
 scenario_container = st.sidebar.container()  # Create the container and assign it to a variable
 model_name = deployment_name if deployment_name else os.getenv('AZURE_OPENAI_MODEL')  
@@ -86,65 +123,73 @@ instructions_placeholder.markdown(
 # Create a Submit button  
 submit_clicked = button_placeholder.button("Submit")  
 
+# Every step of a run is checkpointed and runs as a background job. The run id is kept in the URL, so a rerun
+# re-attaches to the job while it runs, a finished run shows its plan and final output again, and after a restart
+# the page can offer to continue the run from its last completed step
+checkpoints = open_checkpoints(os.getenv('MAS_CHECKPOINT_PATH', DEFAULT_CHECKPOINT_PATH))
+jobs = job_registry()
+max_steps = int(os.getenv('MAS_MAX_STEPS', DEFAULT_MAX_STEPS))
+resume_run_id = st.query_params.get("run")
+running_job = jobs.get(resume_run_id) if resume_run_id else None
+if running_job is not None and running_job.status in FINISHED:
+    running_job = None
+resume_checkpoint = checkpoints.get(resume_run_id) if resume_run_id and running_job is None else None
+resume_clicked = False
+resume_placeholder = st.empty()
+if resume_checkpoint is not None:
+    # The sidebar shows the plan as it was checkpointed
+    StreamlitSink(st, sidebar_placeholder).emit("plan_created", state=checkpoints.load(resume_run_id))
+    if resume_checkpoint["status"] == COMPLETED:
+        resume_placeholder.markdown(resume_checkpoint["final_output"], unsafe_allow_html=True)
+    elif resumable(resume_checkpoint, max_steps):
+        resume_clicked = resume_placeholder.button(f"Resume the interrupted plan after step {resume_checkpoint['steps']}")
+    elif resume_checkpoint["status"] in BUDGET_STOPPED:
+        # Resuming would stop at the same limit again; a run stopped at MAS_MAX_STEPS can be resumed once it is raised
+        if resume_checkpoint["status"] == "max_steps":
+            resume_placeholder.info(f"The plan was stopped after {resume_checkpoint['steps']} steps (MAS_MAX_STEPS). Raise MAS_MAX_STEPS to continue it, or submit a new query.")
+        else:
+            resume_placeholder.info(f"The plan was stopped after {resume_checkpoint['steps']} steps by its token budget (MAS_MAX_TOKENS). Submit a new query to start over.")
+
 # Create a placeholder for the warning message  
 warning_placeholder = st.empty()  
 
 # Create a Submit button
 if __name__ == "__main__":   # Phase 1: Get the initial plan 
-    if submit_clicked:
-        if user_query and (use_environment_key or (api_key.strip() and deployment_name.strip() and endpoint.strip())):
-            # Clear placeholders
-            title_placeholder.empty()
-            input_placeholder.empty()
-            button_placeholder.empty()
-            gif_placeholder.empty()
-            instructions_placeholder.empty()
-
+    if submit_clicked or resume_clicked:
+        if resume_clicked or user_query and (use_mock_llm or use_environment_key or (api_key.strip() and deployment_name.strip() and endpoint.strip())):
             # Setup the MAS orchestrator
 
-            mas_orchestrator = MAS_orchestrator(client, model_name, pydantic_models, st, sidebar_placeholder)
-
-            plan_json, st_memory_json, lt_memory_json = mas_orchestrator.get_initial_plan(industry, use_case, user_query)
-            st.session_state.plan = plan_json
-
-            st_tools = StreamlitTools()
-            st_tools.update_sidebar(plan_json, st, sidebar_placeholder)
-            
-            user_message = mas_orchestrator.get_initial_plan_message(plan_json, st_memory_json, lt_memory_json, st_tools)
-            print(user_message)
-
-            current_task_json, agent_input_json, plan_json, st_memory_json, lt_memory_json = mas_orchestrator.orchestrate_tasks_input(plan_json, st_memory_json, lt_memory_json)
-            user_message = mas_orchestrator.orchestrate_tasks_input_message(agent_input_json, plan_json, st_memory_json, lt_memory_json, st_tools)
-            print("--------- inside 5")
-            print(user_message)
-
-            agent_output_json, plan_json, st_memory_json, lt_memory_json, next_task_json, next_agent_input_json = mas_orchestrator.orchestrate_tasks_output(current_task_json, agent_input_json, plan_json, st_memory_json, lt_memory_json)
-            user_message = mas_orchestrator.orchestrate_tasks_output_message(agent_output_json, plan_json, st_memory_json, lt_memory_json, st_tools)
-            print(user_message)
-
-            while True:
-                current_task_json, agent_input_json, plan_json, st_memory_json, lt_memory_json = mas_orchestrator.orchestrate_tasks_input_loop(agent_output_json, plan_json, st_memory_json, lt_memory_json, next_task_json, next_agent_input_json)
-                user_message = mas_orchestrator.orchestrate_tasks_input_message(agent_input_json, plan_json, st_memory_json, lt_memory_json, st_tools)
-                print(user_message) 
-                agent_output_json, plan_json, st_memory_json, lt_memory_json, next_task_json, next_agent_input_json = mas_orchestrator.orchestrate_tasks_output_loop(current_task_json, agent_input_json, plan_json, st_memory_json, lt_memory_json)
-                user_message = mas_orchestrator.orchestrate_tasks_output_message(agent_output_json, plan_json, st_memory_json, lt_memory_json, st_tools)
-                print(user_message)
-                completion_keys = ["Overall_execution_of_the_plan", "Overall execution of the plan"]
-                completion_statuses = ["complete", "completed", "successful"]
-
-                # Initialize plan_status
-                plan_status = ""
-                
-                plan_json1 = json.loads(plan_json)
-
-                # Check for 'Overall execution of the plan' at the top level of plan3
-                for key in completion_keys:
-                    if key in plan_json1:
-                        plan_status = plan_json1[key].lower()
-                        break
-                if plan_status in completion_statuses:
-                    print("Plan execution completed.")
-                    final_output = mas_orchestrator.summarize_final_output(plan_json, st_memory_json, lt_memory_json, st_tools)
-                    print(final_output)
-                    break
+            run_id = resume_run_id if resume_clicked else uuid.uuid4().hex
+            st.query_params["run"] = run_id
+            # Token budget of each memory tier in the prompts; past it older memory entries are summarized
+            memory_tokens = int(os.getenv('MAS_MEMORY_TOKENS', '0'))
+            memory_store = open_memory_store(os.getenv('MAS_MEMORY_PATH', DEFAULT_STORE_PATH)) if use_memory_store else None
+            # Continue after the last checkpointed step; the sidebar shows the plan as it was
+            resume_state = checkpoints.load(run_id) if resume_clicked else None
+
+            def run_job(job_sink, run_id=run_id, resume_state=resume_state, industry=industry, use_case=use_case, user_query=user_query, memory_store=memory_store):
+                sink = TeeSink(job_sink, CheckpointSink(checkpoints, run_id))
+                # Per-call telemetry (phase, latency, tokens, outcome) is appended to this JSONL file when set
+                if os.getenv('MAS_TELEMETRY_PATH'):
+                    sink = TeeSink(sink, open_telemetry_sink(os.getenv('MAS_TELEMETRY_PATH')))
+                mas_orchestrator = MAS_orchestrator(client, model_name, pydantic_models, sink=sink, fused_step=fused_step, stream_messages=stream_messages, pipelined=pipelined, plan_delta=plan_delta, parallel_subtasks=parallel_subtasks, local_scheduler=local_scheduler, memory_manager=MemoryManager(memory_tokens, memory_tokens) if memory_tokens else None, memory_store=memory_store, max_tokens=int(os.getenv('MAS_MAX_TOKENS', '0')), rate_limiter=rate_limiter_for(model_name, int(os.getenv('MAS_REQUESTS_PER_MINUTE', '0'))), scheduler=scheduler_for(model_name, int(os.getenv('MAS_TOKENS_PER_MINUTE', '0'))))
+                if resume_state is not None:
+                    sink.emit("plan_created", state=resume_state)
+                return mas_orchestrator.run(industry, use_case, user_query, resume_state, max_steps=max_steps)
+
+            running_job = jobs.submit(run_id, run_job)
+
+    if running_job is not None:
+        # Clear placeholders
+        title_placeholder.empty()
+        input_placeholder.empty()
+        button_placeholder.empty()
+        gif_placeholder.empty()
+        instructions_placeholder.empty()
+        resume_placeholder.empty()
+
+        # The run goes on in the background; this only renders its progress and ends with the run or the next rerun
+        if follow_job(running_job, StreamlitSink(st, sidebar_placeholder), st) == FAILED:
+            # Retries are exhausted: keep what was rendered so far instead of failing the whole page
+            st.error(running_job.error)
         #-------------- Input selection - industry, use case, user_query -------------
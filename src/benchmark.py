@@ -0,0 +1,203 @@
+import argparse, contextlib, json, math, os, statistics, sys, time
+from types import SimpleNamespace
+from dotenv import load_dotenv
+
+from src.mas import DEFAULT_MAX_STEPS, MAS_orchestrator
+from src.sinks import EventSink
+from src.tools import StreamlitTools
+from src.clients import azure_client
+from src.cache import DEFAULT_CACHE_PATH, CachedClient, ResponseCache
+from src.mock_llm import MockClient
+from src.runner import load_records
+from src.memory import MemoryManager
+import src.pydantic_models as pydantic_models
+
+# End-to-end benchmark: runs get_initial_plan -> conductor steps -> summarize_final_output for a fixed scenario set
+# through MAS_orchestrator.run, the loop main.py's background jobs run, and writes one JSON document with per-run and summary metrics.
+#
+#   python -m src.benchmark --backend mock --mock-latency 0.2 --output bench.json
+#   python -m src.benchmark --backend replay --cache .mas_cache.sqlite
+#
+# Step latency covers the conductor call(s) of a step and its narration messages. CPU time is the time the
+# orchestrator spent serializing the run state into its prompts, and the process time spent generating the sidebar
+# HTML after every step.
+
+SCENARIOS = [
+    {"id": "retail-pricing", "industry": "Retail", "use_case": "Price comparison", "query": "Find the lowest price for an Xbox across major e-commerce websites"},
+    {"id": "healthcare-scheduling", "industry": "Healthcare", "use_case": "Appointment scheduling", "query": "Schedule follow-up appointments for patients discharged this week"},
+    {"id": "finance-reporting", "industry": "Finance", "use_case": "Data analysis", "query": "Summarize last quarter's expenses by department and flag anomalies"},
+    {"id": "travel-planning", "industry": "Travel", "use_case": "Chatbot", "query": "Plan a three-day trip to Lisbon with hotel and restaurant recommendations"},
+]
+
+
+def percentile(values, q):
+    # Nearest-rank percentile; None for an empty series
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, math.ceil(q / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+class CallCounter:
+    # Counts the parse and create calls that reach the backend. The raw-response API of the Azure client is passed
+    # through, so the orchestrator still times the schema parse (parse_s) apart from the request
+    def __init__(self, client):
+        self.client = client
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self.beta = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(parse=self._parse)))
+        if getattr(client.beta.chat.completions, "with_raw_response", None) is not None:
+            self.beta.chat.completions.with_raw_response = SimpleNamespace(parse=self._raw_parse)
+
+    def _create(self, **kwargs):
+        self.calls += 1
+        return self.client.chat.completions.create(**kwargs)
+
+    def _parse(self, **kwargs):
+        self.calls += 1
+        return self.client.beta.chat.completions.parse(**kwargs)
+
+    def _raw_parse(self, **kwargs):
+        self.calls += 1
+        return self.client.beta.chat.completions.with_raw_response.parse(**kwargs)
+
+
+class BenchmarkSink(EventSink):
+    def __init__(self):
+        self.st_tools = StreamlitTools()
+        self.reset()
+
+    def reset(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.html_cpu = 0.0
+
+    def emit(self, event, **data):
+        if event == "llm_call":
+            self.prompt_tokens += data["prompt_tokens"] or 0
+            self.completion_tokens += data["completion_tokens"] or 0
+            self.cached_tokens += data["cached_tokens"] or 0
+        elif event in ("plan_created", "agent_output"):
+            started = time.process_time()
+            self.st_tools.generate_task_cards(data["state"].Plan)
+            self.html_cpu += time.process_time() - started
+
+    def take(self, serialization_cpu):
+        # serialization_cpu: what the orchestrator spent serializing its prompts since the previous sample
+        sample = {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+            "serialization_cpu_ms": round(serialization_cpu * 1000, 3),
+            "html_cpu_ms": round(self.html_cpu * 1000, 3),
+        }
+        self.reset()
+        return sample
+
+
+def run_scenario(client, model, scenario, fused_step=False, plan_delta=False, parallel_subtasks=False, local_scheduler=False, max_steps=DEFAULT_MAX_STEPS, max_tokens=None, memory_tokens=None):
+    counter = CallCounter(client)
+    sink = BenchmarkSink()
+    mas_orchestrator = MAS_orchestrator(counter, model, pydantic_models, sink=sink, fused_step=fused_step, plan_delta=plan_delta, parallel_subtasks=parallel_subtasks, local_scheduler=local_scheduler, memory_manager=MemoryManager(memory_tokens, memory_tokens) if memory_tokens else None, max_tokens=max_tokens)
+    run = {"id": scenario["id"], "steps": []}
+    started = time.perf_counter()
+    serialized = 0.0
+
+    def record(step):
+        # Called as the plan, each step and the summary finish; each sample covers the time since the previous one
+        nonlocal started, serialized
+        run["steps"].append({"step": step, "latency_s": round(time.perf_counter() - started, 4), **sink.take(mas_orchestrator.serialization_cpu - serialized)})
+        serialized = mas_orchestrator.serialization_cpu
+        started = time.perf_counter()
+
+    plan_started = time.perf_counter()
+    result = mas_orchestrator.run(scenario["industry"], scenario["use_case"], scenario["query"], max_steps=max_steps, on_step=record)
+    run["status"] = result["status"]
+    run["latency_s"] = round(time.perf_counter() - plan_started, 4)
+    run["calls"] = counter.calls
+    return run
+
+
+def summarize(runs):
+    steps = [sample for run in runs for sample in run["steps"] if isinstance(sample["step"], int)]
+    step_latencies = [sample["latency_s"] for sample in steps]
+    plan_latencies = [run["latency_s"] for run in runs]
+    # Mean prompt size by step number shows how the prompt grows as the plan fills in
+    prompt_tokens_by_step = {}
+    for sample in steps:
+        prompt_tokens_by_step.setdefault(sample["step"], []).append(sample["prompt_tokens"])
+    all_samples = [sample for run in runs for sample in run["steps"]]
+    return {
+        "runs": len(runs),
+        "completed": sum(1 for run in runs if run["status"] == "completed"),
+        "step_latency_p50_s": percentile(step_latencies, 50),
+        "step_latency_p95_s": percentile(step_latencies, 95),
+        "plan_latency_p50_s": percentile(plan_latencies, 50),
+        "plan_latency_p95_s": percentile(plan_latencies, 95),
+        "steps_per_plan": statistics.mean(len([s for s in run["steps"] if isinstance(s["step"], int)]) for run in runs) if runs else None,
+        "calls_per_plan": statistics.mean(run["calls"] for run in runs) if runs else None,
+        "prompt_tokens_per_step": statistics.mean(sample["prompt_tokens"] for sample in steps) if steps else None,
+        "completion_tokens_per_step": statistics.mean(sample["completion_tokens"] for sample in steps) if steps else None,
+        "cached_tokens_per_step": statistics.mean(sample["cached_tokens"] for sample in steps) if steps else None,
+        "prompt_tokens_by_step": {str(step): statistics.mean(values) for step, values in sorted(prompt_tokens_by_step.items())},
+        "serialization_cpu_ms": round(sum(sample["serialization_cpu_ms"] for sample in all_samples), 3),
+        "html_cpu_ms": round(sum(sample["html_cpu_ms"] for sample in all_samples), 3),
+    }
+
+
+def build_backend(args):
+    if args.backend == "mock":
+        return MockClient(latency=args.mock_latency, tokens_per_second=args.mock_tokens_per_second, seed=0)
+    if args.backend == "replay":
+        # Recorded responses only: nothing reaches the network and a missing response fails the run
+        return CachedClient(None, ResponseCache(args.cache), mode="replay")
+    client = azure_client(os.getenv('AZURE_OPENAI_ENDPOINT'), os.getenv('AZURE_OPENAI_MODEL'), os.getenv('AZURE_OPENAI_KEY'))
+    if args.record:
+        # Live run that also fills the cache for later --backend replay runs
+        return CachedClient(client, ResponseCache(args.cache), mode="record")
+    return client
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end plan execution latency and token cost.")
+    parser.add_argument("--backend", choices=["mock", "replay", "azure"], default="mock", help="Simulated backend, recorded responses, or the live endpoint")
+    parser.add_argument("--scenarios", help="JSONL file with industry, use_case and query fields per line (default: built-in set)")
+    parser.add_argument("--repeat", type=int, default=1, help="Run every scenario this many times")
+    parser.add_argument("--model", default=os.getenv('AZURE_OPENAI_MODEL') or "mock", help="Model deployment name")
+    parser.add_argument("--fused-step", action="store_true", help="Use a single conductor call per step")
+    parser.add_argument("--plan-delta", action="store_true", help="Have the conductor return only the changed parts of the plan")
+    parser.add_argument("--parallel", action="store_true", help="Run every subtask whose dependencies are met at the same time")
+    parser.add_argument("--local-scheduler", action="store_true", help="Pick the next subtask from the plan locally; one agent call per step")
+    parser.add_argument("--memory-tokens", type=int, default=None, help="Token budget of each memory tier in the prompts (default: unbounded)")
+    parser.add_argument("--max-steps", type=int, default=DEFAULT_MAX_STEPS, help="Stop a plan run after this many conductor steps")
+    parser.add_argument("--max-tokens", type=int, default=None, help="Stop a plan run once its calls have used this many tokens (default: unlimited)")
+    parser.add_argument("--cache", default=os.getenv('MAS_CACHE_PATH', DEFAULT_CACHE_PATH), help="sqlite response cache used by the replay backend")
+    parser.add_argument("--record", action="store_true", help="With --backend azure, store the responses in the cache for replay")
+    parser.add_argument("--mock-latency", type=float, default=0.0, help="Mock time to first token, in seconds")
+    parser.add_argument("--mock-tokens-per-second", type=float, default=None, help="Mock generation speed (default: instant)")
+    parser.add_argument("--output", help="JSON file for the results (default: stdout)")
+    args = parser.parse_args(argv)
+
+    scenarios = load_records(args.scenarios) if args.scenarios else SCENARIOS
+    client = build_backend(args)
+    runs = []
+    # Keep the orchestrator's diagnostics off stdout so the results stay valid JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        for _ in range(args.repeat):
+            for scenario in scenarios:
+                runs.append(run_scenario(client, args.model, scenario, fused_step=args.fused_step, plan_delta=args.plan_delta, parallel_subtasks=args.parallel, local_scheduler=args.local_scheduler, max_steps=args.max_steps, max_tokens=args.max_tokens, memory_tokens=args.memory_tokens))
+
+    config = {key: value for key, value in vars(args).items() if key != "output"}
+    result = json.dumps({"config": config, "summary": summarize(runs), "runs": runs}, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(result + "\n")
+    else:
+        print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import hashlib, json, sqlite3, threading, time
+from types import SimpleNamespace
+
+# Content-addressed cache of LLM responses. CachedClient / AsyncCachedClient wrap an (Async)AzureOpenAI client and
+# expose the two calls the orchestrator makes, beta.chat.completions.parse and chat.completions.create:
+#   record  serve hits from the cache, call the API on a miss and store the response
+#   replay  serve from the cache only, a miss raises CacheMiss (offline runs and benchmarks)
+#   off     always call the API
+#
+#   client = CachedClient(AzureOpenAI(...), ResponseCache(".mas_cache.sqlite"), mode="record")
+
+DEFAULT_CACHE_PATH = ".mas_cache.sqlite"
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+CACHE_MODES = ["off", "record", "replay"]
+
+
+class CacheMiss(LookupError):
+    pass
+
+
+def cache_key(kind, model, messages, response_format=None, stream=False):
+    # The response_format schema is part of the key, so changing a pydantic model invalidates its entries
+    schema = response_format.model_json_schema() if response_format is not None else None
+    payload = json.dumps({"kind": kind, "model": model, "messages": messages, "response_format": schema, "stream": stream}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # Pipelined narration reads and writes from a worker thread
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self.conn.commit()
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        value = json.dumps(value)
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO responses (key, value, size, last_used) VALUES (?, ?, ?, ?)", (key, value, len(value), time.time()))
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        # Least recently used entries go first until both the entry count and the total size fit
+        count, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        while count > self.max_entries or size > self.max_bytes:
+            key, entry_size = self.conn.execute("SELECT key, size FROM responses ORDER BY last_used LIMIT 1").fetchone()
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            count, size = count - 1, size - entry_size
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+# ------------------- Replayed responses -------------------
+# Only the fields the orchestrator reads are rebuilt; usage is None since a cache hit spends no tokens.
+
+# Responses served from the cache carry cached=True (completions and every replayed stream chunk), so the
+# orchestrator counts them as no tokens spent instead of estimating their usage
+
+
+def _parsed_completion(value, response_format):
+    parsed = response_format.model_validate_json(value["parsed"])
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(parsed=parsed, content=value["content"]))], usage=None, cached=True)
+
+
+def _completion(value):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=value["content"]))], usage=None, cached=True)
+
+
+def _stream_chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))], usage=None, cached=True)
+
+
+def _chunk_content(chunk):
+    if not chunk.choices or not chunk.choices[0].delta.content:
+        return ""
+    return chunk.choices[0].delta.content
+
+
+class _CachedParse:
+    def __init__(self, owner):
+        self.owner = owner
+
+    def parse(self, model, messages, response_format, **kwargs):
+        return self.owner._parse(model, messages, response_format, **kwargs)
+
+
+class _CachedCreate:
+    def __init__(self, owner):
+        self.owner = owner
+
+    def create(self, model, messages, stream=False, **kwargs):
+        return self.owner._create(model, messages, stream=stream, **kwargs)
+
+
+class CachedClient:
+    def __init__(self, client, cache, mode="record"):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode: {mode}")
+        self.client = client
+        self.cache = cache
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self.chat = SimpleNamespace(completions=_CachedCreate(self))
+        self.beta = SimpleNamespace(chat=SimpleNamespace(completions=_CachedParse(self)))
+
+    def __getattr__(self, name):
+        # Anything the orchestrator does not call (models, embeddings, ...) goes straight to the wrapped client
+        return getattr(self.client, name)
+
+    def _lookup(self, key):
+        if self.mode == "off":
+            return None
+        value = self.cache.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        if self.mode == "replay":
+            raise CacheMiss(f"No recorded response for {key}")
+        return None
+
+    def _store(self, key, value):
+        if self.mode == "record":
+            self.cache.put(key, value)
+
+    def _parse(self, model, messages, response_format, **kwargs):
+        key = cache_key("parse", model, messages, response_format)
+        value = self._lookup(key)
+        if value is not None:
+            return _parsed_completion(value, response_format)
+        completion = self.client.beta.chat.completions.parse(model=model, messages=messages, response_format=response_format, **kwargs)
+        message = completion.choices[0].message
+        self._store(key, {"parsed": message.parsed.model_dump_json(by_alias=True), "content": message.content})
+        return completion
+
+    def _create(self, model, messages, stream=False, **kwargs):
+        key = cache_key("create", model, messages, stream=stream)
+        value = self._lookup(key)
+        if value is not None:
+            return iter([_stream_chunk(value["content"])]) if stream else _completion(value)
+        completion = self.client.chat.completions.create(model=model, messages=messages, stream=stream, **kwargs)
+        if stream:
+            return self._record_stream(key, completion)
+        self._store(key, {"content": completion.choices[0].message.content})
+        return completion
+
+    def _record_stream(self, key, stream):
+        chunks = []
+        for chunk in stream:
+            chunks.append(_chunk_content(chunk))
+            yield chunk
+        # Only a stream that ran to the end is recorded
+        self._store(key, {"content": "".join(chunks)})
+
+
+class AsyncCachedClient(CachedClient):
+    # Same cache and modes for AsyncAzureOpenAI; the sqlite lookups are local and stay synchronous
+    async def _parse(self, model, messages, response_format, **kwargs):
+        key = cache_key("parse", model, messages, response_format)
+        value = self._lookup(key)
+        if value is not None:
+            return _parsed_completion(value, response_format)
+        completion = await self.client.beta.chat.completions.parse(model=model, messages=messages, response_format=response_format, **kwargs)
+        message = completion.choices[0].message
+        self._store(key, {"parsed": message.parsed.model_dump_json(by_alias=True), "content": message.content})
+        return completion
+
+    async def _create(self, model, messages, stream=False, **kwargs):
+        key = cache_key("create", model, messages, stream=stream)
+        value = self._lookup(key)
+        if value is not None:
+            return self._replay_stream(value["content"]) if stream else _completion(value)
+        completion = await self.client.chat.completions.create(model=model, messages=messages, stream=stream, **kwargs)
+        if stream:
+            return self._record_stream(key, completion)
+        self._store(key, {"content": completion.choices[0].message.content})
+        return completion
+
+    async def _replay_stream(self, content):
+        yield _stream_chunk(content)
+
+    async def _record_stream(self, key, stream):
+        chunks = []
+        async for chunk in stream:
+            chunks.append(_chunk_content(chunk))
+            yield chunk
+        self._store(key, {"content": "".join(chunks)})
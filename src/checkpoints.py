@@ -0,0 +1,83 @@
+import sqlite3, threading, time
+
+from src.sinks import EventSink
+from src.pydantic_models import RunState
+
+# Checkpoints of in-flight plan runs. CheckpointSink stores the run state (plan, memories, next task and next agent
+# input) in a local sqlite file after the plan is created and after every step's agent output, so a run interrupted
+# by a rerun, a disconnected browser or a restart continues from its last completed step instead of paying for all
+# of them again:
+#
+#   store = CheckpointStore(".mas_checkpoints.sqlite")
+#   sink = TeeSink(job_sink, CheckpointSink(store, run_id))
+#   state = store.load(run_id)    # None for a new run; otherwise pass it on to the conductor loop
+#
+# The checkpoint of a completed run keeps the final output, so it can be reported without running anything. A run
+# stopped by its step or token budget keeps that status: resuming it would only hit the same limit again, so it is
+# resumed only once the step limit has been raised (see resumable).
+
+DEFAULT_CHECKPOINT_PATH = ".mas_checkpoints.sqlite"
+RUNNING = "running"
+COMPLETED = "completed"
+BUDGET_STOPPED = ("max_steps", "max_tokens")
+
+
+class CheckpointStore:
+    def __init__(self, path=DEFAULT_CHECKPOINT_PATH):
+        # Pipelined narration and concurrent runs save from several threads
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS checkpoints (run_id TEXT PRIMARY KEY, status TEXT NOT NULL, steps INTEGER NOT NULL, state TEXT NOT NULL, final_output TEXT, updated REAL NOT NULL)")
+        self.conn.commit()
+
+    def save(self, run_id, state, status=RUNNING, final_output=None):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (run_id, status, steps, state, final_output, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                (run_id, status, state.Steps, state.model_dump_json(), final_output, time.time()),
+            )
+            self.conn.commit()
+
+    def load(self, run_id):
+        # Returns the last checkpointed RunState of the run, or None
+        checkpoint = self.get(run_id)
+        if checkpoint is None:
+            return None
+        return RunState.model_validate_json(checkpoint["state"])
+
+    def get(self, run_id):
+        with self.lock:
+            row = self.conn.execute("SELECT status, steps, state, final_output, updated FROM checkpoints WHERE run_id = ?", (run_id,)).fetchone()
+        if row is None:
+            return None
+        return {"run_id": run_id, "status": row[0], "steps": row[1], "state": row[2], "final_output": row[3], "updated": row[4]}
+
+    def delete(self, run_id):
+        with self.lock:
+            self.conn.execute("DELETE FROM checkpoints WHERE run_id = ?", (run_id,))
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def resumable(checkpoint, max_steps):
+    # An interrupted run, or one stopped by its step budget that the current max_steps leaves room for. A run that
+    # used up its token budget is not resumed: its tokens are not checkpointed, so the limit would not hold
+    if checkpoint["status"] == "max_steps":
+        return checkpoint["steps"] < max_steps
+    return checkpoint["status"] == RUNNING
+
+
+class CheckpointSink(EventSink):
+    def __init__(self, store, run_id):
+        self.store = store
+        self.run_id = run_id
+
+    def emit(self, event, **data):
+        if event in ("plan_created", "agent_output"):
+            self.store.save(self.run_id, data["state"])
+        elif event == "plan_completed":
+            self.store.save(self.run_id, data["state"], status=COMPLETED, final_output=data["final_output"])
+        elif event == "run_stopped":
+            self.store.save(self.run_id, data["state"], status=data["status"])
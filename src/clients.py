@@ -0,0 +1,62 @@
+import importlib.util, os, threading
+import httpx
+from openai import AsyncAzureOpenAI, AzureOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient
+
+# Azure OpenAI client factory. Every client owns an httpx connection pool, so building one per Streamlit rerun
+# repeats the TCP and TLS handshakes on every step. azure_client() keeps one client per endpoint, deployment and key
+# for the whole process, which reuses its connections across steps, reruns and sessions.
+# Pool size, keep-alive and HTTP/2 come from the environment:
+#   MAS_HTTP_MAX_CONNECTIONS (default 100), MAS_HTTP_KEEPALIVE_CONNECTIONS (default 20),
+#   MAS_HTTP_KEEPALIVE_SECONDS (default 90), MAS_HTTP2=1 (needs the h2 package, falls back to HTTP/1.1 without it)
+
+API_VERSION = "2024-08-01-preview"
+
+
+def pool_limits(max_connections=None):
+    return httpx.Limits(
+        max_connections=max_connections or int(os.getenv('MAS_HTTP_MAX_CONNECTIONS', '100')),
+        max_keepalive_connections=int(os.getenv('MAS_HTTP_KEEPALIVE_CONNECTIONS', '20')),
+        # Steps are often more than a few seconds apart; httpx's 5 second default would drop the idle connection
+        keepalive_expiry=float(os.getenv('MAS_HTTP_KEEPALIVE_SECONDS', '90')),
+    )
+
+
+def http2_enabled():
+    if os.getenv('MAS_HTTP2', '0').lower() not in ("1", "true", "yes"):
+        return False
+    if importlib.util.find_spec("h2") is None:
+        print("MAS_HTTP2 is set but the h2 package is not installed, using HTTP/1.1")
+        return False
+    return True
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def azure_client(endpoint, deployment, api_key, api_version=API_VERSION):
+    with _clients_lock:
+        key = (endpoint, deployment, api_key, api_version)
+        if key not in _clients:
+            _clients[key] = AzureOpenAI(
+                azure_endpoint=endpoint,
+                azure_deployment=deployment,
+                api_key=api_key,
+                api_version=api_version,
+                # MAS_orchestrator retries itself (see resilience.py)
+                max_retries=0,
+                http_client=DefaultHttpxClient(limits=pool_limits(), http2=http2_enabled()),
+            )
+        return _clients[key]
+
+
+def async_azure_client(endpoint, deployment, api_key, api_version=API_VERSION, max_connections=None):
+    # Not shared: an async pool belongs to the event loop it was first used on
+    return AsyncAzureOpenAI(
+        azure_endpoint=endpoint,
+        azure_deployment=deployment,
+        api_key=api_key,
+        api_version=api_version,
+        max_retries=0,
+        http_client=DefaultAsyncHttpxClient(limits=pool_limits(max_connections), http2=http2_enabled()),
+    )
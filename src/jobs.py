@@ -0,0 +1,183 @@
+import contextlib, os, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.sinks import EventSink
+
+# Background plan runs. The Streamlit script thread only submits a run and follows its progress; the run itself belongs
+# to a process-wide worker pool, so a widget interaction, a rerun or a closed tab no longer abandons it, and a slow
+# plan does not keep a script run busy while other sessions wait. Every event of the run is kept on its Job; the page
+# replays them through a StreamlitSink and waits for new ones, and a rerun re-attaches to the job by its id (the run id
+# in the URL):
+#
+#   job = job_registry().submit(run_id, lambda sink: MAS_orchestrator(..., sink=sink).run(industry, use_case, query))
+#   follow_job(job_registry().get(run_id), StreamlitSink(st, sidebar_placeholder), st)
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+FINISHED = (COMPLETED, FAILED)
+
+# Finished jobs stay attachable this long after their last event
+JOB_TTL_SECONDS = 3600
+# How often a following page re-checks a job that has no new events, and the fastest it re-renders a streamed message
+POLL_SECONDS = 0.5
+RENDER_INTERVAL_SECONDS = 0.05
+
+# Why a run stopped without completing, by the status of its result
+STOP_MESSAGES = {
+    "failed": "The plan stopped in the {error_phase} phase ({error}). The steps completed so far are shown above and in the sidebar.",
+    "max_steps": "The plan was stopped after {steps} steps without completing (MAS_MAX_STEPS). The steps completed so far are shown above and in the sidebar.",
+    "max_tokens": "The plan was stopped after using {tokens} tokens without completing (MAS_MAX_TOKENS). The steps completed so far are shown above and in the sidebar.",
+}
+STOPPED_MESSAGE = "The plan stopped before it was completed. The steps completed so far are shown above and in the sidebar."
+
+
+class Job:
+    def __init__(self, job_id):
+        self.id = job_id
+        self.status = QUEUED
+        # (event, data) in emission order; the spinner text and the partial streamed message are kept apart
+        self.events = []
+        self.activity = None
+        self.partial = None
+        self.final_output = None
+        self.error = None
+        self.updated = time.time()
+        # Bumped on every change, followers wait for it to move
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def update(self, event=None, data=None, **fields):
+        with self.condition:
+            if event is not None:
+                self.events.append((event, data))
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.version += 1
+            self.updated = time.time()
+            self.condition.notify_all()
+
+    def changes(self, seen, version, timeout=POLL_SECONDS):
+        # Waits up to timeout for anything newer than version; returns the version, the events after the first seen
+        # ones, the spinner text, the partial message and the status
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            return self.version, self.events[seen:], self.activity, self.partial, self.status
+
+
+class JobSink(EventSink):
+    # Records the events of a background run on its Job; the page that follows the job renders them
+    def __init__(self, job):
+        self.job = job
+
+    def emit(self, event, **data):
+        # Per-call telemetry is for the telemetry sinks, the page has no use for it
+        if event == "llm_call":
+            return
+        if event == "message":
+            # The page renders the finished message in one piece; the streamed text was shown as the partial message
+            self.job.update(event, dict(data, streamed=False), partial=None)
+        else:
+            self.job.update(event, data)
+
+    @contextlib.contextmanager
+    def spinner(self, text):
+        self.job.update(activity=text)
+        try:
+            yield
+        finally:
+            self.job.update(activity=None)
+
+    def message_stream(self):
+        def write(text, done=False):
+            if not done:
+                self.job.update(partial=text)
+
+        return write
+
+
+class JobRegistry:
+    def __init__(self, max_workers=8):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mas-job")
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, job_id, work):
+        # work(sink) runs the plan with the given sink and returns the result of MAS_orchestrator.run
+        with self.lock:
+            self._expire()
+            job = self.jobs.get(job_id)
+            if job is not None and job.status not in FINISHED:
+                return job
+            job = self.jobs[job_id] = Job(job_id)
+        self.executor.submit(self._run, job, work)
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def _run(self, job, work):
+        job.update(status=RUNNING)
+        try:
+            result = work(JobSink(job))
+        except Exception as e:
+            print(f"An unexpected error occurred: {e}")
+            job.update(status=FAILED, error=str(e), activity=None, partial=None)
+            return
+        if result["status"] == "completed":
+            job.update(status=COMPLETED, final_output=result["final_output"], activity=None, partial=None)
+        else:
+            job.update(status=FAILED, error=stop_message(result), activity=None, partial=None)
+
+    def _expire(self):
+        now = time.time()
+        for job_id, job in list(self.jobs.items()):
+            if job.status in FINISHED and now - job.updated > JOB_TTL_SECONDS:
+                del self.jobs[job_id]
+
+
+def stop_message(result):
+    # Why the run of a MAS_orchestrator.run result stopped, for the page
+    if result["status"] == "failed" and "error_phase" not in result:
+        return STOPPED_MESSAGE
+    return STOP_MESSAGES[result["status"]].format(**dict(result, error=str(result.get("error")).rstrip(".")))
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def job_registry():
+    # One registry per process: every session submits to, and re-attaches from, the same worker pool
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = JobRegistry(int(os.getenv('MAS_JOB_WORKERS', '8')))
+        return _registry
+
+
+def follow_job(job, sink, st):
+    # Replays the job's events through sink, then renders new ones as they arrive until the job has finished. The
+    # spinner text or the partial streamed message is shown in a placeholder kept below the last rendered event
+    seen, version = 0, None
+    tail = st.empty()
+    while True:
+        version, events, activity, partial, status = job.changes(seen, version)
+        if events:
+            tail.empty()
+            for event, data in events:
+                sink.emit(event, **data)
+            seen += len(events)
+            tail = st.empty()
+        if status in FINISHED:
+            tail.empty()
+            return status
+        if partial:
+            tail.markdown(partial + "▌", unsafe_allow_html=True)
+        elif activity:
+            tail.info(activity, icon="⏳")
+        else:
+            tail.empty()
+        time.sleep(RENDER_INTERVAL_SECONDS)
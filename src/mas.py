@@ -1,1224 +1,843 @@
+import asyncio, functools, inspect, json, threading, time
+from concurrent.futures import ThreadPoolExecutor
 from openai import BadRequestError
-import streamlit as st
+
+import src.prompts as prompts
+from src.plan_state import apply_plan_delta, dependency_outputs, mark_completed, merge_subtask_results, next_subtask, plan_completed, prompt_json, ready_subtasks, subtask_failed
+from src.sinks import NullSink
+from src.telemetry import CallTrace
+from src.resilience import RetryPolicy
+from src.scheduler import IN_FLIGHT, NEW_PLAN
+from src.memory import estimate_tokens
+
+# The first fused step has no previous agent output; the conductor starts with the first task of the plan
+FIRST_STEP_TASK_JSON = '{"Task": "Start with the first task in the plan", "Subtask": "Start with the first subtask in the plan"}'
+
+# Conductor response fields copied onto the run state as they are
+STATE_FIELDS = ["Current_Task", "Agent_Input", "Agent_Output", "Next_Task", "Next_Agent_Input"]
+
+# Conductor steps a plan run may take before it is stopped, for plans the model never finishes
+DEFAULT_MAX_STEPS = 25
+
+
+def driven(method):
+    # Every phase is written once, as a generator that yields its LLM calls (and its waits) as zero-argument callables
+    # and gets their results, or their exceptions, sent back. _drive makes the calls: MAS_orchestrator blocks on them and
+    # AsyncMAS_orchestrator awaits them, so on the async orchestrator the same phase methods return coroutines
+    @functools.wraps(method)
+    def drive(self, *args, **kwargs):
+        return self._drive(method(self, *args, **kwargs))
+
+    return drive
+
 
 class MAS_orchestrator:
-    def __init__(self, client, model, pydantic_models, st, sidebar_placeholder, ):
+    def __init__(self, client, model, pydantic_models, fused_step=False, stream_messages=False, pipelined=False, plan_delta=False, sink=None, retry_policy=None, rate_limiter=None, scheduler=None, parallel_subtasks=False, max_parallel=4, local_scheduler=False, max_replans=2, memory_manager=None, memory_store=None, max_tokens=None):
         self.client = client
         self.model = model
         self.pydantic_models = pydantic_models
-        self.st = st
-        self.sidebar_placeholder = sidebar_placeholder
+        # Everything the orchestrator shows or records goes through the event sink
+        self.sink = sink or NullSink()
+        # Fused step: select the subtask, run the agent and update the plan in a single conductor call
+        self.fused_step = fused_step
+        # Stream narration tokens to the sink as they arrive instead of waiting for the full completion
+        self.stream_messages = stream_messages
+        # Pipelined: narration messages run on a worker thread while the next conductor call is in flight
+        self.pipelined = pipelined
+        # Plan delta: the conductor returns only changed statuses, outputs and observations, applied to the plan held here
+        self.plan_delta = plan_delta
+        # Parallel subtasks: the planner declares subtask dependencies and each step runs every ready subtask at once
+        self.parallel_subtasks = parallel_subtasks
+        self.max_parallel = max_parallel
+        # Local scheduler: the next subtask is picked from the plan and its Agent Input filled from a template, so each
+        # step is one agent call; the conductor is only asked to revise the plan when a subtask fails
+        self.local_scheduler = local_scheduler
+        self.max_replans = max_replans
+        # Bounded memory: the prompts carry recent memory entries and a summary of older ones, within a token budget
+        self.memory_manager = memory_manager
+        # Long-term memory that outlives the run: completed plans are saved to it and the planner gets the relevant entries
+        self.memory_store = memory_store
+        # Transient failures (429, timeouts, 5xx) are retried with backoff; the rate limiter is shared per deployment
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter
+        # Token-per-minute budget shared with the other plan runs on the deployment
+        self.scheduler = scheduler
+        # Token budget of the whole run (prompt and completion tokens of every call); see budget_exhausted
+        self.max_tokens = max_tokens
+        self.tokens_used = 0
+        # CPU seconds spent serializing the run state into prompts, for benchmarks
+        self.serialization_cpu = 0.0
+        self.usage_lock = threading.Lock()
+        self.message_executor = None
+        self.pending_messages = []
+        # (phase, error) of the last error event, reported as the reason when the run stops without completing
+        self.last_error = None
+
+    # ------------------- LLM calls -------------------
+
+    def _drive(self, phase):
+        result, error = None, None
+        try:
+            while True:
+                try:
+                    call = phase.throw(error) if error is not None else phase.send(result)
+                except StopIteration as stop:
+                    return stop.value
+                try:
+                    result, error = call(), None
+                except Exception as e:
+                    result, error = None, e
+        finally:
+            phase.close()
+
+    # The waits the phases yield; AsyncMAS_orchestrator returns awaitables from these instead
+
+    def _sleep(self, seconds):
+        time.sleep(seconds)
+
+    def _acquire(self, tokens, priority):
+        return self.scheduler.acquire(tokens, priority)
+
+    def _next_chunk(self, stream):
+        return next(stream, None)
+
+    def _parse(self, prompt_content, response_format, spinner_text="Processing your query and generating initial agent composition and plan...", system_prompt=None, phase=None):
+        messages = [{"role": "user", "content": prompt_content}]
+        if system_prompt is not None:
+            messages.insert(0, {"role": "system", "content": system_prompt})
+        with self.sink.spinner(spinner_text):
+            completion = yield from self._with_retries(phase, "parse", self.model, messages, lambda trace: self._call_parse(trace, messages, response_format))
+        return completion.choices[0].message.parsed
+
+    def _call_parse(self, trace, messages, response_format):
+        completions = self.client.beta.chat.completions
+        raw_api = getattr(completions, "with_raw_response", None)
+        if raw_api is None:
+            completion = yield functools.partial(completions.parse, model=self.model, messages=messages, response_format=response_format, timeout=self.retry_policy.timeout)
+        else:
+            # The raw response defers decoding, so the schema parse is timed apart from the request
+            raw = yield functools.partial(raw_api.parse, model=self.model, messages=messages, response_format=response_format, timeout=self.retry_policy.timeout)
+            with trace.parsing():
+                completion = raw.parse()
+        self._report_usage(trace, completion)
+        return completion
+
+    def _with_retries(self, phase, kind, model, messages, call):
+        for attempt in range(1, self.retry_policy.max_attempts + 1):
+            if self.rate_limiter is not None:
+                yield functools.partial(self._sleep, self.rate_limiter.reserve())
+            reserved = None
+            if self.scheduler is not None:
+                reserved = yield functools.partial(self._acquire, self.scheduler.estimate(phase, kind, messages), self._priority(phase, kind))
+            usage = (None, None)
+            try:
+                with CallTrace(self.sink, phase, kind, model, attempt) as trace:
+                    result = yield from call(trace)
+                usage = self._usage(trace, messages, result)
+                self._meter(usage)
+                return result
+            except Exception as e:
+                if attempt == self.retry_policy.max_attempts or not self._should_retry(e, trace):
+                    raise
+                error = e
+            finally:
+                # Every attempt gives its reservation back, a failed one or a cached response in full
+                self._settle(phase, kind, reserved, usage)
+            delay = self.retry_policy.delay(attempt, error)
+            print(f"Transient error in {phase} (attempt {attempt}), retrying in {delay:.1f}s: {error}")
+            yield functools.partial(self._sleep, delay)
+
+    def _priority(self, phase, kind):
+        # Only the planner call starts a new plan; every other call belongs to a plan already in flight
+        return NEW_PLAN if phase == "plan" and kind == "parse" else IN_FLIGHT
+
+    def _settle(self, phase, kind, reserved, usage):
+        if reserved is not None:
+            self.scheduler.settle(phase, kind, reserved, *usage)
+
+    def _usage(self, trace, messages, result):
+        # (prompt, completion) tokens of a finished call. A response served from the response cache spent nothing.
+        # Streamed narrations report no usage; their tokens are estimated from the prompt and the text. Any other call
+        # without usage is not counted: (None, None)
+        if trace.data["cache_hit"]:
+            return 0, 0
+        if trace.data["prompt_tokens"] is not None:
+            return trace.data["prompt_tokens"], trace.data["completion_tokens"]
+        if isinstance(result, str) or trace.data["ttft_s"] is not None:
+            return sum(estimate_tokens(message["content"]) for message in messages), estimate_tokens(result if isinstance(result, str) else None)
+        return None, None
+
+    def _meter(self, usage):
+        with self.usage_lock:
+            self.tokens_used += sum(tokens or 0 for tokens in usage)
+
+    def budget_exhausted(self, state, max_steps=None):
+        # "max_steps" or "max_tokens" once the run has used up that budget, None while it may take another step
+        if max_steps is not None and state.Steps >= max_steps:
+            return "max_steps"
+        if self.max_tokens and self.tokens_used >= self.max_tokens:
+            return "max_tokens"
+        return None
+
+    def _should_retry(self, e, trace):
+        # A narration that already streamed text to the user is not replayed
+        return self.retry_policy.is_transient(e) and trace.data["ttft_s"] is None
+
+    # ------------------- Narration: render the agent message to the user -------------------
+
+    def _narrate(self, user_message, model=None, phase=None):
+        messages = [{"role": "user", "content": user_message}]
+        model = model or self.model
+        write = self.sink.message_stream() if self.stream_messages else None
+        if write is None:
+            completion = yield from self._with_retries(phase, "create", model, messages, lambda trace: self._call_create(trace, model, messages))
+            return completion.choices[0].message.content, False
+        return (yield from self._with_retries(phase, "create", model, messages, lambda trace: self._stream_narration(trace, write, model, messages))), True
+
+    def _call_create(self, trace, model, messages):
+        completion = yield functools.partial(
+            self.client.chat.completions.create,
+            model=model,
+            messages=messages,
+            timeout=self.retry_policy.timeout,
+        )
+        self._report_usage(trace, completion)
+        return completion
+
+    def _stream_narration(self, trace, write, model, messages):
+        chunks = []
+        stream = yield functools.partial(
+            self.client.chat.completions.create,
+            model=model,
+            messages=messages,
+            stream=True,
+            timeout=self.retry_policy.timeout,
+        )
+        while (chunk := (yield functools.partial(self._next_chunk, stream))) is not None:
+            trace.served_from_cache(chunk)
+            # Azure sends prompt filter results as a first chunk without choices
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            trace.first_token()
+            chunks.append(chunk.choices[0].delta.content)
+            write("".join(chunks))
+        content = "".join(chunks)
+        write(content, done=True)
+        return content
+
+    # ------------------- Pipelined narration -------------------
+
+    def dispatch_message(self, message_fn, *args):
+        if not self.pipelined:
+            user_message = message_fn(*args)
+            print(user_message)
+            return user_message
+
+        if self.message_executor is None:
+            # A single worker keeps the messages (and their sidebar updates) in plan order
+            self.message_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mas-narration")
+        self.pending_messages.append(self.message_executor.submit(self._render_message, message_fn, args))
+
+    def _render_message(self, message_fn, args):
+        user_message = message_fn(*args)
+        print(user_message)
+        return user_message
+
+    def wait_for_messages(self):
+        for future in self.pending_messages:
+            future.result()
+        self.pending_messages = []
+
+    def _shutdown_messages(self):
+        if self.message_executor is not None:
+            self.message_executor.shutdown()
+            self.message_executor = None
+
+    # ------------------- Plan delta mode -------------------
+
+    def _conductor_prompt(self, system_prompt):
+        if not self.plan_delta:
+            return system_prompt
+        return system_prompt + prompts.PLAN_DELTA_INSTRUCTIONS
+
+    def _conductor_format(self, response_format):
+        if not self.plan_delta:
+            return response_format
+        return getattr(self.pydantic_models, response_format.__name__ + "Delta")
+
+    # ------------------- Parallel subtasks -------------------
+
+    def _planner_prompt(self, industry, use_case, user_query):
+        user_message = prompts.initial_plan_prompt(industry, use_case, user_query)
+        if self.memory_store is not None:
+            # Only the top-k entries of earlier runs, so the prompt stays the same size however long the history gets
+            learnings = self.memory_store.search(industry, use_case, user_query)
+            if learnings:
+                user_message += prompts.past_learnings_prompt(json.dumps(learnings, separators=(",", ":")))
+        if not self.parallel_subtasks:
+            return user_message
+        return user_message + prompts.PLAN_DEPENDENCIES_INSTRUCTIONS
+
+    def _subtask_messages(self, state, task, subtask):
+        prompt_content = prompts.subtask_agent_state(
+            task.model_dump_json(exclude_none=True, exclude={"Sub_Tasks"}),
+            self._prompt_json(subtask),
+            json.dumps(dependency_outputs(state.Plan, subtask), separators=(",", ":")),
+            self._prompt_json(state.Plan),
+            self._memory_json(state, "Short_Term"),
+            self._memory_json(state, "Long_Term"),
+        )
+        return [{"role": "system", "content": prompts.SUBTASK_AGENT_SYSTEM_PROMPT}, {"role": "user", "content": prompt_content}]
+
+    def _scheduled_agent_input(self, state, task, subtask):
+        return self.pydantic_models.AgentInput(
+            agent_input=prompts.agent_input_template(subtask.Agent, subtask.Agent_Function, subtask.Sub_Task, task.Task, state.Query),
+            Agent=subtask.Agent,
+            Agent_Function=subtask.Agent_Function,
+        )
+
+    def _scheduled_prompt(self, state, task, subtask, agent_input):
+        # Only the subtask, its input and the outputs it depends on; the agent does not need the whole plan
+        return prompts.scheduled_agent_state(
+            task.model_dump_json(exclude_none=True, exclude={"Sub_Tasks"}),
+            self._prompt_json(subtask),
+            self._prompt_json(agent_input),
+            json.dumps(dependency_outputs(state.Plan, subtask), separators=(",", ":")),
+            self._memory_json(state, "Short_Term"),
+            self._memory_json(state, "Long_Term"),
+        )
+
+    def _replan_prompt(self, state, task, subtask, result):
+        failed = subtask.model_copy(update={"Sub_Task_Output": result.Agent_Output.agent_output, "Sub_Task_Output_Observation": result.Sub_Task_Output_Observation, "Subtask_Status": result.Subtask_Status})
+        return prompts.replan_state(json.dumps({"Task": task.Task, **failed.model_dump(exclude_none=True)}, separators=(",", ":")), self._prompt_json(state.Plan), self._memory_json(state, "Short_Term"), self._memory_json(state, "Long_Term"))
+
+    def _replanned_state(self, state, event):
+        update = {"Replans": state.Replans + 1}
+        if event is not None:
+            update.update(Plan=mark_completed(event.Plan), Short_Term_Memory=event.Short_Term_Memory, Long_Term_Memory=event.Long_Term_Memory)
+        return self._remember(state.model_copy(update=update))
+
+    def _parallel_state(self, state, ready, results):
+        # One new RunState for the whole step: the results are merged into the plan at once, and the agent inputs and
+        # outputs are combined so the narration messages cover every subtask that ran
+        completed = [(task, subtask, result) for (task, subtask), result in zip(ready, results) if result is not None]
+        if not completed:
+            return None
+        models = self.pydantic_models
+        agents = ", ".join(dict.fromkeys(result.Agent_Output.Agent for _, _, result in completed))
+        functions = ", ".join(dict.fromkeys(result.Agent_Output.Agent_Function for _, _, result in completed))
+        return self._remember(state.model_copy(update={
+            "Plan": merge_subtask_results(state.Plan, [(task.Task, subtask.Sub_Task, result) for task, subtask, result in completed]),
+            "Short_Term_Memory": models.ShortTermMemory(
+                Thought="Run the next subtask of the plan" if len(completed) == 1 else f"Run the {len(completed)} subtasks whose dependencies are met at the same time",
+                Action=", ".join(f"{result.Agent_Output.Agent}.{result.Agent_Output.Agent_Function}" for _, _, result in completed),
+                Observation=" ".join(result.Sub_Task_Output_Observation for _, _, result in completed),
+            ),
+            "Current_Task": models.CurrentTask(Task=", ".join(dict.fromkeys(task.Task for task, _, _ in completed)), Subtask=", ".join(subtask.Sub_Task for _, subtask, _ in completed)),
+            "Agent_Input": models.AgentInput(agent_input="\n\n".join(f"{result.Agent_Input.Agent}: {result.Agent_Input.agent_input}" for _, _, result in completed), Agent=agents, Agent_Function=functions),
+            "Agent_Output": models.AgentOutput(agent_output="\n\n".join(f"{result.Agent_Output.Agent}: {result.Agent_Output.agent_output}" for _, _, result in completed), Agent=agents, Agent_Function=functions),
+            "Next_Task": None,
+            "Next_Agent_Input": None,
+            "Steps": state.Steps + 1,
+        }))
+
+    # ------------------- Long-term memory store -------------------
+
+    def _save_run(self, state):
+        if self.memory_store is None:
+            return
+        try:
+            self.memory_store.save_run(state)
+        except Exception as e:
+            # The run itself has completed; losing its memories is not worth failing it
+            print(f"Could not save the run to the long-term memory store: {e}")
+
+    def _no_ready_subtasks(self):
+        # Every subtask left waits on another one that has not run: the dependencies form a cycle
+        return self._stalled("agent", "No subtask can run: the remaining subtasks depend on each other")
+
+    def _stalled(self, phase, e):
+        # The conductor left out what the step needs to go on; the run stops here with this as the reason
+        print(e)
+        self._emit_error(phase, e)
+
+    # ------------------- Run state -------------------
+
+    def _next_state(self, state, event):
+        # Returns a new RunState; the previous one may still be read by a pipelined narration message
+        update = {field: getattr(event, field) for field in STATE_FIELDS if field in type(event).model_fields}
+        if hasattr(event, "Plan_Updates"):
+            update["Plan"] = apply_plan_delta(state.Plan, event.Plan_Updates)
+        else:
+            update["Plan"] = event.Plan
+        update["Short_Term_Memory"] = event.Short_Term_Memory
+        update["Long_Term_Memory"] = event.Long_Term_Memory
+        if "Agent_Output" in update:
+            update["Steps"] = state.Steps + 1
+        # The statuses can say the plan is done before the model writes its overall verdict
+        update["Plan"] = mark_completed(update["Plan"])
+        return self._remember(state.model_copy(update=update))
+
+    def _remember(self, state):
+        # Records the memories the conductor just wrote in the bounded logs the prompts carry
+        if self.memory_manager is None:
+            return state
+        return state.model_copy(update={
+            "Short_Term_Log": self.memory_manager.record(state.Short_Term_Log, state.Short_Term_Memory, "Short_Term"),
+            "Long_Term_Log": self.memory_manager.record(state.Long_Term_Log, state.Long_Term_Memory, "Long_Term"),
+        })
+
+    def _prompt_json(self, model, default="{}"):
+        # Thread CPU time, so subtasks serialized in parallel are not counted once per running thread
+        started = time.thread_time()
+        serialized = prompt_json(model, default)
+        with self.usage_lock:
+            self.serialization_cpu += time.thread_time() - started
+        return serialized
+
+    def _memory_json(self, state, tier):
+        log = getattr(state, tier + "_Log")
+        if log is None:
+            return self._prompt_json(getattr(state, tier + "_Memory"))
+        return self._prompt_json(log)
+
+    def _has_plan(self, state):
+        if state is None:
+            print("Missing required inputs for AI Conductor.")
+            return False
+        return True
 
-    def get_initial_plan(self, industry, use_case, user_query):
-        user_message = f"""You are a Task Decomposition Planner Agent. Your role is to analyze user requests and break them down into executable tasks using available AI agents and their functions.
-
-        ### Instructions:
-        1. **Analyze Request**: Parse the user's request to identify necessary high-level agents and their functions. Avoid unnecessary complexity.
-        2. **Decompose Tasks**: Break down the request into clear task descriptions for each agent/function. Do not detail specific steps within each function.
-        3. **Plan Creation**: Develop a sophisticated plan with the agents you have available, you decided howm many steps the plan should have to solve the problem using the agents you have at your disposal. A plan should have about 5-6 steps.  
-        4. **Memory Utilization**:
-        - **Short-Term Memory**: Use for planning and executing the current plan.
-        - **Long-Term Memory**: Use for overall plan execution and incorporating learnings from past plans.
-        5. Always output the plan, short-term memory and long-term memory.
-        6. Create meaningful agent names insted of using numbered agents. so instead of Agent 1 it should be a meaningful name for the agent executing the task. 
-
-        ### JSON Formatting:
-        - Use triple backticks with `json` for all JSON content.
-        - Start each section with `##` followed by the section name.
-        - Ensure all JSON objects and arrays are properly closed with matching braces and commas.
-        - Use double quotes for all keys and string values.
-        - Do not include extra text outside the JSON sections.
-        - After each JSON section, state 'JSON section complete.'
-
-        ### Accessibility:
-        - Provide perfectly formatted JSON to ensure compatibility with JSON readers.
-
-        Use the following information to create the required agents and plan for the industry and use case here:
-
-        Industry:
-        {industry}
-
-        Use case:
-        {use_case}
-
-        # INPUTS:
-
-        - The only required input is the request and the agents_definition. If a plan is not included, you must create one and generate the short-term and long-term memory.
-
-        ## Request (the overall task to solve) {{
-        ```json
-        {{ 
-            "request": {{  
-                "inbound_request": "{user_query}"
-            }}  
-        }}
-        ```
-
-        #Agent Definitions
-        ```json
-        {{    
-            "Name of Agent 1": {{   
-                "Definition": "The description of the agent",    
-                "function_1": {{   
-                    "name": "function_name",    
-                    "task": "The task for the agent to execute"    
-                }}   
-            }},    
-            "Name of Agent 2": {{   
-                "Definition": "The description of the agent",    
-                "function_1": {{   
-                    "name": "function_name",    
-                    "task": "The task for the agent to execute"    
-                }}   
-            }},
-            // Add more agents as needed
-        }}   
-        ```
-
-        OUTPUT:
-
-        ##Plan (the plan to be executed)
-        ```json
-        {{
-            "Tasks": [
-                {{
-                    "Task": "Description of Task 1",
-                    "Task_Output": "Output of Task 1",
-                    "Task_Output_Observation": "Observation of Task 1",
-                    "Task_Status": "Status of Task 1, default should be blank",
-                    "Sub_Tasks": [
-                        {{
-                            "Sub_Task": "Description of Subtask 1",
-                            "Agent": "Agent Name",
-                            "Agent_Function": "Function Name",
-                            "Sub_Task_Output": "Output of Subtask 1",
-                            "Sub_Task_Output_Observation": "Observation of Subtask 1",
-                            "Subtask_Status": "Status of Subtask 1, default should be blank""
-                        }},
-                        {{
-                            "Sub_Task": "Description of Subtask 2",
-                            "Agent": "Agent Name",
-                            "Agent_Function": "Function Name",
-                            "Sub_Task_Output": "Output of Subtask 2",
-                            "Sub_Task_Output_Observation": "Observation of Subtask 2",
-                            "Subtask_Status": "Status of Subtask 2, default should be blank""
-                        }}
-                        // Add more Subtasks as needed
-                    ]
-                }},
-                {{
-                    "Task": "Description of Task 2",
-                    "Task_Output": "Output of Task 2",
-                    "Task_Output_Observation": "Observation of Task 2",
-                    "Task_Status": "Status of Task 2, default should be blank"",
-                    "Sub_Tasks": [
-                        // Subtasks for Task 2
-                    ]
-                }}
-                // Add more Tasks as needed
-            ],
-            "Overall_execution_of_the_plan": "In-Progress or Completed. Default should be blank"
-        }}
-        ```
-
-        ##Short-Term Memory (used to generate thought, action, observation and can be used to make the current plan more efficient and optimized)
-        ```json
-        {{
-        "st_memory": {{
-            "Thought": "The initial idea",
-            "Action": "The action taken",
-            "Observation": "The observed output"
-        }}
-        }}
-        ```
-
-        ##Long-Term Memory (used to generate thought, action, observation and can be used to make the future plans more efficient and optimized. The information generated here is related to the overall plan and can be used to help optimize future plans with observation it has learned with the current plan.)
-        ```json
-        {{
-        "lt_memory": {{
-            "Thought": "The initial idea",
-            "Action": "The action taken",
-            "Observation": "The observed output"
-        }}
-        }}
-        ```
-        """
+    # ------------------- Events -------------------
+
+    def _emit(self, event, state, **data):
+        self.sink.emit(event, state=state, **data)
+        return state
+
+    def _emit_message(self, phase, narration, state):
+        content, streamed = narration
+        self.sink.emit("message", phase=phase, content=content, streamed=streamed, state=state)
+        return content
+
+    def _report_usage(self, trace, completion):
+        trace.served_from_cache(completion)
+        usage = getattr(completion, "usage", None)
+        if usage is None:
+            return
+        # Cached tokens are the part of the prompt prefix the provider served from its prompt cache
+        trace.set_usage(usage)
+        print(f"Tokens ({trace.data['phase']}): prompt {usage.prompt_tokens} (cached {trace.data['cached_tokens']}), completion {usage.completion_tokens}")
 
+    def _emit_error(self, phase, e):
+        self.last_error = (phase, str(e))
+        self.sink.emit("error", phase=phase, error=str(e))
+
+    # ------------------- Phase 1: Planner -------------------
+
+    @driven
+    def get_initial_plan(self, industry, use_case, user_query):
+        user_message = self._planner_prompt(industry, use_case, user_query)
         try:
-            loading_placeholder = self.st.empty()
-            with self.st.spinner("Processing your query and generating initial agent composition and plan..."):
-                completion = self.client.beta.chat.completions.parse(
-                    model=self.model,
-                    messages=[
-                        {"role": "user", "content": user_message}
-                    ],
-                    response_format=self.pydantic_models.OverallResponse,
-                )
-            loading_placeholder.empty()
-            event = completion.choices[0].message.parsed
-
-            plan = event.Plan
-            st_memory = event.Short_Term_Memory
-            lt_memory = event.Long_Term_Memory
-
-            plan_json = plan.model_dump_json(indent=2)
-            st_memory_json = st_memory.model_dump_json(indent=2)
-            lt_memory_json = lt_memory.model_dump_json(indent=2)
-
-            return plan_json, st_memory_json, lt_memory_json
+            event = yield from self._parse(user_message, self.pydantic_models.OverallResponse, phase="plan")
+            return self._emit("plan_created", self._remember(self.pydantic_models.RunState(Plan=event.Plan, Short_Term_Memory=event.Short_Term_Memory, Long_Term_Memory=event.Long_Term_Memory, Industry=industry, Use_Case=use_case, Query=user_query)))
 
         except BadRequestError as e:
             print(f"API Request Failed: {e}")
-            return None, None, None
+            self._emit_error("plan", e)
         except Exception as e:
             print(f"An unexpected error occurred: {e}")
-            return None, None, None
-
-    def get_initial_plan_message(self, plan_json, st_memory_json, lt_memory_json, st_tools):
-        user_message = f"""Summarize the plan and provide it as a meaningful response back to the user on what the overall plan is and how it will be executed. Provide the response like it was the agent speaking back to the user on what it's going to do. Always start with the Agent name. Also state that you will use short-term memory and long-term memory to help with the planning and future plans.
-
-        The plan: {plan_json}
-        
-        ### HTML Formatting:
-        - Provide a header using a `<span>` with specific styles.
-        - Ensure all HTML tags are properly closed.
-        - Do not include HTML within JSON sections.
-
-        Generate a chatbot message using markdown that includes an agent's message with a formatted example plan similar to the one below:
-
-        **Important:** Do not include any code blocks or triple backticks in your response. Provide the content as plain markdown. 
-        
-        <span style="color:#4B9CD3; font-size:28px; font-weight:bold;">Planner Agent</span>
-
-        <span style="color:#DAA520;">Hello! I'm here to help you outline a comprehensive plan for Marketing and Research. Here's an example to get you started:</span>
-
-        ##### 📅 Project Plan
-
-        - 🔍 Research market trends
-            - **Agent:** Web Search Agent
-            - **Function:** perform_search
-        - 🏨 Select and recommend suitable venues
-            - **Agent:** Venue Selection Agent
-            - **Function:** select_venue
-        - 🗓️ Create a detailed trip schedule
-            - **Agent:** Scheduling Agent
-            - **Function:** create_schedule
-        - 💰 Calculate the overall trip budget
-            - **Agent:** Budgeting Agent
-            - **Function:** manage_budget
-        - 🍽️ Arrange catering services if needed during the trip
-            - **Agent:** Catering Agent
-            - **Function:** arrange_catering
-        """
+            self._emit_error("plan", e)
+
+    @driven
+    def get_initial_plan_message(self, state):
+        user_message = prompts.initial_plan_message_prompt(self._prompt_json(state.Plan))
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "user", "content": user_message}
-                ],
-            )
-
-            event = completion.choices[0].message
-            self.st.markdown(event.content, unsafe_allow_html=True)
-            self.st.session_state.plan = plan_json if 'plan_json' in locals() else {}
-            self.st.session_state.st_memory = st_memory_json if 'st_memory_json' in locals() else {}  
-            self.st.session_state.lt_memory = lt_memory_json if 'lt_memory_json' in locals() else {} 
-
-            if 'plan_json' in locals() and plan_json: 
-                self.st.session_state.plan = plan_json   
-                st_tools.update_sidebar(plan_json, self.st, self.sidebar_placeholder)
-
-            self.st.markdown(  
-                """  
-                <hr style="border: none; height: 2px; background-color: white; width: 50%; margin-left: auto; margin-right: auto;">  
-                """,  
-                unsafe_allow_html=True  
-            )  
-
-            return event.content
+            return self._emit_message("plan", (yield from self._narrate(user_message, phase="plan")), state)
 
         except BadRequestError as e:
             print(f"API Request Failed: {e}")
-            return None, None, None
         except Exception as e:
             print(f"An unexpected error occurred: {e}")
-            return None, None, None
 
-    def orchestrate_tasks_input(self, plan_json, st_memory_json, lt_memory_json):
-        if not all([plan_json, st_memory_json, lt_memory_json]):
-            print("Missing required inputs for AI Conductor.")
+    # ------------------- Phase 2: AI Conductor Input -------------------
+
+    @driven
+    def orchestrate_tasks_input(self, state):
+        if not self._has_plan(state):
             return
 
-        prompt_content = f"""You are the AI Conductor, responsible for orchestrating a team of specialized AI agents to achieve the user's goals effectively.
-
-            ### Instructions:
-            1. **Plan Execution**: 
-                - Receive a plan with tasks and subtasks, specifying the agent and function for each.
-                - Track the output and status of each task and subtask. Must be Successful, Unsuccessful, or In Progress.
-                - When all subtasks are Completed or Successful, update the 'Task', 'Task_Output', 'Task_Output_Observation', 'Task_Status' to Successful.
-                - The subtask being executed must remain In Progress.
-                - Manage communication between agents.
-
-            2. **Memory Utilization**:
-                - **Short-Term Memory**: Orchestrate and execute the current plan, recording thoughts, actions, and observations.
-                - **Long-Term Memory**: Maintain overall orchestration details and learnings from past plans to optimize future executions.
-
-            ### JSON Formatting:
-            - Enclose all JSON content within triple backticks and specify as `json`.
-            - Start each section with `##` followed by the section name.
-            - Ensure all JSON objects and arrays are properly closed with matching braces and commas.
-            - Use double quotes for all keys and string values.
-            - Do not include extra text outside the JSON sections.
-            - Keep responses concise to avoid exceeding token limits.
-            - Do not add unnecessary carriage returns.
-
-            ### Critical JSON Formatting Rules:
-            - All JSON objects and arrays must have matching braces.
-            - Separate all key-value pairs with commas.
-            - Use double quotes for both keys and string values.
-            - Avoid trailing commas after the last key-value pair.
-            - Validate JSON formatting before outputting.
-
-            ### INSTRUCTION
-            - Always output the Current Task, Agent Input, Plan, Short-Term Memory and Long-Term Memory
-
-            ##Current Task
-            ```json
-            {{
-                "Task": {{  
-                    "Task": "Start with the first task in the plan",  
-                    "Subtask": "Start with the first task in the plan" 
-                }}  
-            }}
-            ```
-            ##Plan
-            ```json
-            {plan_json}
-            ```
-
-            ##Short-Term Memory
-            ```json
-            {st_memory_json}
-            ```
-
-            ##Long-Term Memory
-            ```json
-            {lt_memory_json}
-            ```
-
-            #OUTPUTS:
-
-            ##Current Task
-            ```json
-            {{
-                "Task": {{
-                    "Task": "The current task",
-                    "Subtask": "The current subtask"
-                    }}
-            }}
-            ```
-
-            ##Agent Input
-            ```json
-            {{
-                "Agent_Input": {{
-                    "agent_input": "The task for the agent to execute.",
-                    "Agent": "The agent that will execute the task",
-                    "Agent_Function": "The function that the agent will execute for the task"
-                    }}
-            }}
-            ```
-            ##Plan (the plan to be executed)
-                ```json
-                {{
-                    "Tasks": [
-                        {{
-                            "Task": "Description of Task 1",
-                            "Task_Output": "The overall output if the task was successful or not, this may be blank if the task hasn't been executed yet.",
-                            "Task_Output_Observation": "The thought and observation of the overall success of the tasks",
-                            "Task_Status": "Successful, Unsuccessful, or In Progress; this may be blank if the task hasn't been executed yet. Must be In Progress if a sub-task is In Progress, can only change to Sucessful if all sub-task are sucessful",
-                            "Sub_Tasks": [
-                                {{
-                                    "Sub_Task": "Description of Subtask 1",
-                                    "Agent": "Agent Name",
-                                    "Agent_Function": "The agent function to be used to execute the task",
-                                    "Sub_Task_Output": "The overall output of the subtask if it was successful or not, this may be blank if the task hasn't been executed yet",
-                                    "Sub_Task_Output_Observation": "The thought and observation of the overall success of the subtask, this may be blank if the task hasn't been executed yet",
-                                    "Subtask_Status": "Successful or Unsuccessful; this may be blank if the task hasn't been executed yet"
-                                }},
-                                {{
-                                    "Sub_Task": "Description of Subtask 2",
-                                    "Agent": "Agent Name",
-                                    "Agent_Function": "The agent function to be used to execute the task",
-                                    "Sub_Task_Output": "The overall output of the subtask if it was successful or not, this may be blank if the task hasn't been executed yet",
-                                    "Sub_Task_Output_Observation": "The thought and observation of the overall success of the subtask, this may be blank if the task hasn't been executed yet",
-                                    "Subtask_Status": "Successful or Unsuccessful; this may be blank if the task hasn't been executed yet"
-                                }}
-                                // all other subtasks for Task 1
-                            ]
-                        }},
-                        {{
-                            "Task": "Description of Task 2",
-                            "Task_Output": "The overall output if the task was successful or not, this may be blank if the task hasn't been executed yet.",
-                            "Task_Output_Observation": "The thought and observation of the overall success of the tasks",
-                            "Task_Status": "Successful, Unsuccessful, or In Progress; this may be blank if the task hasn't been executed yet. Must be In Progress if a sub-task is In Progress, can only change to Sucessful if all sub-task are sucessful",
-                            "Sub_Tasks": [
-                                // all other Subtasks for Task 2
-                            ]
-                        }}
-                        // All other Tasks 
-                    ],
-                    "Overall_execution_of_the_plan": "In-Progress or Completed. When all sub-tasks have been executed, either successful or not successful, you must change this to Completed"
-                }}
-                ```
-
-                ##Short-Term Memory
-                ```json
-                {{
-                "st_memory": {{
-                    "Thought": "The initial idea",
-                    "Action": "The action taken",
-                    "Observation": "The observed output"
-                }}
-                }}
-                ```
-
-                ##Long-Term Memory
-                ```json
-                {{
-                "lt_memory": {{
-                    "Thought": "The overall idea",
-                    "Action": "The overall action taken",
-                    "Observation": "The overall observed output"
-                }}
-                }}
-                ```
-                """
+        system_prompt = self._conductor_prompt(prompts.TASKS_INPUT_SYSTEM_PROMPT)
+        prompt_content = prompts.tasks_input_state(self._prompt_json(state.Plan), self._memory_json(state, "Short_Term"), self._memory_json(state, "Long_Term"))
         try:
-            loading_placeholder = self.st.empty()
-            with self.st.spinner("Processing your query and generating initial agent composition and plan..."):
-                completion = self.client.beta.chat.completions.parse(
-                    model=self.model,
-                    messages=[
-                        {"role": "user", "content": prompt_content}
-                    ],
-                    response_format=self.pydantic_models.OverallResponse1,  # Adjust if AI Conductor has a different response structure
-                )
-
-            loading_placeholder.empty()
-            event = completion.choices[0].message.parsed
+            event = yield from self._parse(prompt_content, self._conductor_format(self.pydantic_models.OverallResponse1), system_prompt=system_prompt, phase="input")
 
             # Debug: Print the AI Conductor's response
             print("----- Phase 2: AI Conductor Input-----")
-            #print(event)
-            plan = event.Plan
-            current_task = event.Current_Task
-            agent_input = event.Agent_Input
-            st_memory = event.Short_Term_Memory
-            lt_memory = event.Long_Term_Memory
-
-            # Serialize the extracted data to JSON strings
-            current_task_json = current_task.model_dump_json(indent=2)
-            agent_input_json = agent_input.model_dump_json(indent=2)
-
-            plan_json = plan.model_dump_json(indent=2)
-            st_memory_json = st_memory.model_dump_json(indent=2)
-            lt_memory_json = lt_memory.model_dump_json(indent=2)
-
-            return current_task_json, agent_input_json, plan_json, st_memory_json, lt_memory_json
+            return self._emit("step_started", self._next_state(state, event))
 
         except BadRequestError as e:
             print(f"API Request Failed: {e}")
-        except Exception as e: 
+            self._emit_error("input", e)
+        except Exception as e:
             print(f"An unexpected error occurred: {e}")
+            self._emit_error("input", e)
 
-    # ------------------- Message output from Phase 1
-    def orchestrate_tasks_input_message(self, agent_input_json, plan_json, st_memory_json, lt_memory_json, st_tools):
-        print("Inside 1.22 --------") 
-        user_message = f"""Summarize the query and action of the agent and provide it as a meaningful response back to the user on what the agent is about to do. Provide the response like it was the agent speaking back to the user on what it's going to do. Always start with the Agent name. Agent Input: {agent_input_json}
-
-                            ### HTML Formatting:
-                            - Provide a header using a `<span>` with specific styles.
-                            - Ensure all HTML tags are properly closed.
-                            - Do not include HTML within JSON sections.
-                            
-                            Generate a chatbot message using markdown that includes an agent's message with a formatted example plan similar to the one below:
+    # ------------------- Message output from Phase 2
 
-                            **Important:** Do not include any code blocks or triple backticks in your response. Provide the content as plain markdown. 
-
-                            Example:
-                            <span style="color:#4B9CD3; font-size:28px; font-weight:bold;">Planner Agent</span>
-
-                            <span style="color:#DAA520;">Hello! I see you want to integrate product search functionality into the shopping assistant. Here's what I will do:</span>
-
-                            ##### 🎯 Task
-                                I will work on integrating a robust product search functionality that allows users to easily find and access products within the shopping assistant. This will include implementing search algorithms, indexing products, and providing relevant search results to enhance the user experience.
-
-                            """
+    @driven
+    def orchestrate_tasks_input_message(self, state):
+        user_message = prompts.tasks_input_message_prompt(self._prompt_json(state.Agent_Input))
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "user", "content": user_message}
-                ],
-            )
-            
-            event = completion.choices[0].message
-
-            self.st.markdown(event.content, unsafe_allow_html=True)
-
-            
-
-            self.st.session_state.plan = plan_json if 'plan_json' in locals() else {}
-            self.st.session_state.st_memory = st_memory_json if 'st_memory_json' in locals() else {}  
-            self.st.session_state.lt_memory = lt_memory_json if 'lt_memory_json' in locals() else {}
-
-            if 'plan_json' in locals() and plan_json:  
-                print("Inside 2 --------") 
-                self.st.session_state.plan = plan_json
-                st_tools.update_sidebar(plan_json, self.st, self.sidebar_placeholder)
-            
+            content = self._emit_message("input", (yield from self._narrate(user_message, phase="input")), state)
 
             print("----- Phase 2: AI Conductor Input Message -----")
-
-            return event.content
+            return content
 
         except BadRequestError as e:
             print(f"API Request Failed: {e}")
-            return None, None, None
         except Exception as e:
             print(f"An unexpected error occurred: {e}")
-            return None, None, None
 
-    # ------------------- Phase 2: AI Conductor -------------------
+    # ------------------- Phase 3: AI Conductor Output -------------------
 
-    def orchestrate_tasks_output(self, current_task_json, agent_input_json, plan_json, st_memory_json, lt_memory_json):
-        if not all([current_task_json, agent_input_json, plan_json, st_memory_json, lt_memory_json]):
-            print("Missing required inputs for AI Conductor.")
+    @driven
+    def orchestrate_tasks_output(self, state):
+        if not self._has_plan(state):
             return
+        if state.Current_Task is None:
+            return self._stalled("output", "The conductor did not select a subtask to run")
 
-        prompt_content = f"""You are the AI Conductor, responsible for orchestrating a team of specialized AI agents to achieve the user's goals effectively.
-
-                        ### Instructions:
-                        1. **Plan Execution**: 
-                        - Receive a plan with tasks and subtasks, specifying the agent and function for each.
-                        - Track the output and status of each task and subtask. Must be Successful, Unsuccessful, or In Progress.
-                        - When all subtasks are Completed or Sucessful, update the  'Task', 'Task_Output', 'Task_Output_Observation', 'Task_Status' to Successful.
-                        - Manage communication between agents.
-                        - Always output the Agent Output, Plan, Short-Term Memory, Long-Term Memory, Next Task and Next Agent Input
-                        - when all task_status are Successfull or Completed, update the 'Overall execution of the plan' to Successful
-                        - the agent_output MUST synthetic data that can help with the task being executed. It should contain the RAW synthetic data.
-                        - The subtask being executed, must now be Sucessful, unless it failed and the next subtask must be set to In Progress.
-                        - For any task that has a subtask as In Progress you must set the task status to In Progress, if all subtasks from that task is sucessful you must change the task status to Sucessful.
-
-                        2. **Memory Utilization**:
-                        - **Short-Term Memory**: Orchestrate and execute the current plan, recording thoughts, actions, and observations.
-                        - **Long-Term Memory**: Maintain overall orchestration details and learnings from past plans to optimize future executions.
-
-            ### JSON Formatting:
-            - Enclose all JSON content within triple backticks and specify as `json`.
-            - Start each section with `##` followed by the section name.
-            - Ensure all JSON objects and arrays are properly closed with matching braces and commas.
-            - Use double quotes for all keys and string values.
-            - Do not include extra text outside the JSON sections.
-            - Keep responses concise to avoid exceeding token limits.
-            - Do not add unnecessary carriage returns.
-
-            ### Critical JSON Formatting Rules:
-            - All JSON objects and arrays must have matching braces.
-            - Separate all key-value pairs with commas.
-            - Use double quotes for both keys and string values.
-            - Avoid trailing commas after the last key-value pair.
-            - Validate JSON formatting before outputting.
-
-            ### INSTRUCTION
-            - Always output the Current Task, Agent Input, Plan, Short-Term Memory and Long-Term Memory
-
-            ##Current Task
-            ```json
-            {current_task_json}
-            ```
-            ##Agent Input
-            ```json
-            {agent_input_json}
-            ```
-            ##Plan
-            ```json
-            {plan_json}
-            ```
-
-            ##Short-Term Memory
-            ```json
-            {st_memory_json}
-            ```
-
-            ##Long-Term Memory
-            ```json
-            {lt_memory_json}
-            ```
-
-            #OUTPUTS:
-            
-            ##Agent Output 
-            ```json
-                {{
-                "Agent_Output": {{
-                    "agent_output": "Generated very detailed synthetic data that can help with the task being executed. If the query is a database query, the agent_output should be generated synthetic data raw data retrieved from the database",  
-                    "Agent": "The agent that executed the task",
-                    "Agent Function": "the function executed"
-                    }}
-                }}
-            ```
-            ##Plan (the plan to be executed)
-                ```json
-                {{
-                    "Tasks": [
-                        {{
-                            "Task": "Description of Task 1",
-                            "Task_Output": "The agent_output",
-                            "Task_Output_Observation": "The thought and observation of the overall success of the tasks",
-                            "Task_Status": "Successful, Unsuccessful, or In Progress; this may be blank if the task hasn't been executed yet. Must be In Progress if a sub-task is In Progress, can only change to Sucessful if all sub-task are sucessful",
-                            "Sub_Tasks": [
-                                {{
-                                    "Sub_Task": "Description of Subtask 1",
-                                    "Agent": "Agent Name",
-                                    "Agent_Function": "The agent function to be used to execute the task",
-                                    "Sub_Task_Output": "The overall output of the subtask if it was successful or not, this may be blank if the task hasn't been executed yet",
-                                    "Sub_Task_Output_Observation": "The thought and observation of the overall success of the subtask, this may be blank if the task hasn't been executed yet",
-                                    "Subtask_Status": "Successful or Unsuccessful; this may be blank if the task hasn't been executed yet"
-                                }},
-                                {{
-                                    "Sub_Task": "Description of Subtask 2",
-                                    "Agent": "Agent Name",
-                                    "Agent_Function": "The agent function to be used to execute the task",
-                                    "Sub_Task_Output": "The overall output of the subtask if it was successful or not, this may be blank if the task hasn't been executed yet",
-                                    "Sub_Task_Output_Observation": "The thought and observation of the overall success of the subtask, this may be blank if the task hasn't been executed yet",
-                                    "Subtask_Status": "Successful or Unsuccessful; this may be blank if the task hasn't been executed yet"
-                                }}
-                                // all other subtasks for Task 1
-                            ]
-                        }},
-                        {{
-                            "Task": "Description of Task 2",
-                            "Task_Output": "The overall output if the task was successful or not, this may be blank if the task hasn't been executed yet.",
-                            "Task_Output_Observation": "The thought and observation of the overall success of the tasks",
-                            "Task_Status": "Successful, Unsuccessful, or In Progress; this may be blank if the task hasn't been executed yet. Must be In Progress if a sub-task is In Progress, can only change to Sucessful if all sub-task are sucessful",
-                            "Sub_Tasks": [
-                                // all other Subtasks for Task 2
-                            ]
-                        }}
-                        // All other Tasks 
-                    ],
-                    "Overall_execution_of_the_plan": "In-Progress or Completed. When all sub-tasks have been executed, either successful or not successful, you must change this to Completed"
-                }}
-                ```
-                ##Short-Term Memory
-                ```json
-                {{
-                "st_memory": {{
-                    "Thought": "The initial idea",
-                    "Action": "The action taken",
-                    "Observation": "The observed output"
-                }}
-                }}
-                ```
-                ##Long-Term Memory
-                ```json
-                {{
-                "lt_memory": {{
-                    "Thought": "The overall idea",
-                    "Action": "The overall action taken",
-                    "Observation": "The overall observed output"
-                }}
-                }}
-                ```
-                ##Next Task
-                ```json
-                {{  
-                "Task": {{  
-                    "Task": "The next task to execute",  
-                    "Subtask": "The next subtask to execute"
-                    }}  
-                }}
-                ```
-                ##Next Agent Input
-                ```json
-                {{
-                    "Agent_Input": {{
-                        "agent_input": "The next task for the agent to execute",
-                        "Agent": "The agent that will execute the task",
-                        "Agent_Function": "The function that the agent will execute for the task"
-                        }}
-                }}
-                ```
-                """
+        system_prompt = self._conductor_prompt(prompts.TASKS_OUTPUT_SYSTEM_PROMPT)
+        prompt_content = prompts.tasks_output_state(self._prompt_json(state.Current_Task), self._prompt_json(state.Agent_Input), self._prompt_json(state.Plan), self._memory_json(state, "Short_Term"), self._memory_json(state, "Long_Term"))
         try:
-            loading_placeholder = self.st.empty()
-            with self.st.spinner("Processing your query and generating initial agent composition and plan..."):
-                completion = self.client.beta.chat.completions.parse(
-                    model=self.model,
-                messages=[
-                    {"role": "user", "content": prompt_content}
-                ],
-                response_format=self.pydantic_models.OverallResponse2,  # Adjust if AI Conductor has a different response structure
-            )
-            loading_placeholder.empty()
-
-            event = completion.choices[0].message.parsed
+            event = yield from self._parse(prompt_content, self._conductor_format(self.pydantic_models.OverallResponse2), system_prompt=system_prompt, phase="output")
 
             # Debug: Print the AI Conductor's response
             print("----- Phase 3: AI Conductor Output -----")
-            agent_output = event.Agent_Output
-            plan = event.Plan
-            st_memory = event.Short_Term_Memory
-            lt_memory = event.Long_Term_Memory
-            next_task = event.Next_Task
-            next_agent_input = event.Next_Agent_Input
-
-
-            # Serialize the extracted data to JSON strings
-            agent_output_json = agent_output.model_dump_json(indent=2)
-            plan_json = plan.model_dump_json(indent=2)
-            st_memory_json = st_memory.model_dump_json(indent=2)
-            lt_memory_json = lt_memory.model_dump_json(indent=2)
-            next_task_json = next_task.model_dump_json(indent=2)
-            next_agent_input_json = next_agent_input.model_dump_json(indent=2)
-
-            print(plan_json)
-
-            return agent_output_json, plan_json, st_memory_json, lt_memory_json, next_task_json, next_agent_input_json
+            return self._emit("agent_output", self._next_state(state, event))
 
         except BadRequestError as e:
             print(f"API Request Failed: {e}")
-        except Exception as e: 
+            self._emit_error("output", e)
+        except Exception as e:
             print(f"An unexpected error occurred: {e}")
+            self._emit_error("output", e)
 
     # ------------------- Message output from Phase 3
 
-    def orchestrate_tasks_output_message(self, agent_output_json, plan_json, st_memory_json, lt_memory_json, st_tools):
-        user_message = f"""Summarize the output of the agent and provide it as a meaningful response back to the user on what the agent did and the output data. Do not talk about the generation of the synthetic data, instead present it like data that you were able to collect. Provide the response like it was the agent speaking back to the user on what it just did. Always start with the Agent name. Agent Input: {agent_output_json}
-
-                            Use what is in the 
-
-                            ### HTML Formatting:
-                                - Provide a header using a `<span>` with specific styles.
-                                - Ensure all HTML tags are properly closed.
-                                - Do not include HTML within JSON sections.
-                            
-                            Generate a chatbot message using markdown that includes an agent's message with a formatted example plan similar to the one below make sure to update the information with the content of the agent input:
+    @driven
+    def orchestrate_tasks_output_message(self, state):
+        user_message = prompts.tasks_output_message_prompt(self._prompt_json(state.Agent_Output))
+        try:
+            content = self._emit_message("output", (yield from self._narrate(user_message, phase="output")), state)
 
-                            **Important:** Do not include any code blocks or triple backticks in your response. Provide the content as plain markdown. 
+            print("----- Phase 3: AI Conductor Output Message -----")
+            return content
 
-                            Example:
-                                <span style="color:#DAA520;">Data analysis and retreival completed and successful</span>
+        except BadRequestError as e:
+            print(f"API Request Failed: {e}")
+        except Exception as e:
+            print(f"An unexpected error occurred: {e}")
 
-                                ##### 📝 Data Used:
-                                    - **Current Engagement Metrics:**
-                                        - Website Visits: 15,000
-                                        - Average Session Duration: 3 minutes 45 seconds
-                                        - Bounce Rate: 50%
-                                        - Conversion Rate: 2%
+    # ------------------- Phase 4: AI Conductor loop -------------------
 
-                                    - **Customer Feedback:**
-                                        - *Customer 101:* "Great selection of products, but the website is a bit slow."
-                                        - *Customer 102:* "Love the discounts and promotions!"
-                                        - *Customer 103:* "Would like to see more personalized recommendations."
+    @driven
+    def orchestrate_tasks_input_loop(self, state):
+        if not self._has_plan(state):
+            return
+        if state.Next_Task is None:
+            return self._stalled("input", "The conductor did not name the next task")
 
-                                    - **Market Trends:**
-                                        - Personalization: Yes
-                                        - Mobile Optimization: Yes
-                                        - Social Media Integration: Yes
-                            """
+        system_prompt = self._conductor_prompt(prompts.TASKS_INPUT_LOOP_SYSTEM_PROMPT)
+        prompt_content = prompts.tasks_input_loop_state(self._prompt_json(state.Plan), self._memory_json(state, "Short_Term"), self._memory_json(state, "Long_Term"), self._prompt_json(state.Next_Task), self._prompt_json(state.Next_Agent_Input))
         try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "user", "content": user_message}
-                ],
-            )
-
-            event = completion.choices[0].message
-
-            self.st.markdown(event.content, unsafe_allow_html=True)
-            
-            self.st.session_state.plan = plan_json if 'plan_json' in locals() else {}
-            self.st.session_state.st_memory = st_memory_json if 'st_memory_json' in locals() else {}  
-            self.st.session_state.lt_memory = lt_memory_json if 'lt_memory_json' in locals() else {}
-
-            if 'plan_json' in locals() and plan_json:  
-                self.st.session_state.plan = plan_json  
-                st_tools.update_sidebar(plan_json, self.st, self.sidebar_placeholder)
-
-            self.st.markdown(  
-                """  
-                <hr style="border: none; height: 2px; background-color: white; width: 50%; margin-left: auto; margin-right: auto;">  
-                """,  
-                unsafe_allow_html=True  
-            )  
+            event = yield from self._parse(prompt_content, self._conductor_format(self.pydantic_models.OverallResponse1), system_prompt=system_prompt, phase="input")
 
-            print("----- Phase 2: AI Conductor Input Message -----")
-
-            return event.content
+            # Debug: Print the AI Conductor's response
+            print("----- Phase 4: AI Conductor Input 2 Loop-----")
+            return self._emit("step_started", self._next_state(state, event))
 
         except BadRequestError as e:
             print(f"API Request Failed: {e}")
-            return None, None, None
+            self._emit_error("input", e)
         except Exception as e:
             print(f"An unexpected error occurred: {e}")
-            return None, None, None
+            self._emit_error("input", e)
 
-    def orchestrate_tasks_input_loop(self, agent_output_json, plan_json, st_memory_json, lt_memory_json, next_task_json, next_agent_input_json):
-        if not all([agent_output_json, plan_json, st_memory_json, lt_memory_json, next_task_json, next_agent_input_json]):
-            print("Missing required inputs for AI Conductor.")
+    @driven
+    def orchestrate_tasks_output_loop(self, state):
+        if not self._has_plan(state):
             return
-        
-        prompt_content = f"""You are the AI Conductor, responsible for orchestrating a team of specialized AI agents to achieve the user's goals effectively.
-
-        You are the AI Conductor, responsible for orchestrating a team of specialized AI agents to achieve the user's goals effectively.
-
-                                        ### Instructions:
-                                        1. **Plan Execution**: 
-                                        - Receive a plan with tasks and subtasks, specifying the agent and function for each.
-                                        - Track the output and status of each task and subtask. Must be Successful, Unsuccessful, or In Progress.
-                                        - When all subtasks for that task are Completed or Successful, you must update the  'Task', 'Task_Output', 'Task_Output_Observation', 'Task_Status' to Successful.
-                                        - when all task_status are Successfull or Completed, update the 'Overall execution of the plan' to Successful. Do not continue or make up a new agent or request.
-                                        - Manage communication between agents.
-                                        - Always output the Current Task, Agent Input, Plan (including the 'Overall execution of the plan'), Short-Term Memory, Long-Term Memory 
-                                        
-                                        - The subtask being executed must remain In Progress.
-                                        - For any task that has a subtask as In Progress you must set the task status to In Progress, if all subtasks from that task is 'Successful' you must change the task status to 'Successful'.
-
-                                        2. **Memory Utilization**:
-                                        - **Short-Term Memory**: Orchestrate and execute the current plan, recording thoughts, actions, and observations.
-                                        - **Long-Term Memory**: Maintain overall orchestration details and learnings from past plans to optimize future executions.
-
-            ### JSON Formatting:
-            - Enclose all JSON content within triple backticks and specify as `json`.
-            - Start each section with `##` followed by the section name.
-            - Ensure all JSON objects and arrays are properly closed with matching braces and commas.
-            - Use double quotes for all keys and string values.
-            - Do not include extra text outside the JSON sections.
-            - Keep responses concise to avoid exceeding token limits.
-            - Do not add unnecessary carriage returns.
-
-            ### Critical JSON Formatting Rules:
-            - All JSON objects and arrays must have matching braces.
-            - Separate all key-value pairs with commas.
-            - Use double quotes for both keys and string values.
-            - Avoid trailing commas after the last key-value pair.
-            - Validate JSON formatting before outputting.
-
-            ##Current Task
-            ```json
-            {next_task_json}
-            ```
-            ##Next Agent Input
-            ```json
-            {next_agent_input_json}
-            ```
-            ##Plan
-            ```json
-            {plan_json}
-            ```
-            ##Short-Term Memory
-            ```json
-            {st_memory_json}
-            ```
-            ##Long-Term Memory
-            ```json
-            {lt_memory_json}
-            ```
-
-            #OUTPUTS:
-
-            ##Current Task
-            ```json
-            {{
-                "Task": {{
-                    "Task": "The current task",
-                    "Subtask": "The current subtask"
-                    }}
-            }}
-            ```
-            ##Agent Input
-            ```json
-            {{
-                "Agent_Input": {{
-                    "agent_input": "The task for the agent to execute.",
-                    "Agent": "The agent that will execute the task",
-                    "Agent_Function": "The function that the agent will execute for the task"
-                    }}
-            }}
-            ```
-            ##Plan (the plan to be executed)
-            ```json
-                {{
-                    "Tasks": [
-                        {{
-                            "Task": "Description of Task 1",
-                            "Task_Output": "The overall output if the task was successful or not, this may be blank if the task hasn't been executed yet.",
-                            "Task_Output_Observation": "The thought and observation of the overall success of the tasks",
-                            "Task_Status": "Successful, Unsuccessful, or In Progress; this may be blank if the task hasn't been executed yet. Must be In Progress if a sub-task is In Progress, can only change to Sucessful if all sub-task are sucessful",
-                            "Sub_Tasks": [
-                                {{
-                                    "Sub_Task": "Description of Subtask 1",
-                                    "Agent": "Agent Name",
-                                    "Agent_Function": "The agent function to be used to execute the task",
-                                    "Sub_Task_Output": "The overall output of the subtask if it was successful or not, this may be blank if the task hasn't been executed yet",
-                                    "Sub_Task_Output_Observation": "The thought and observation of the overall success of the subtask, this may be blank if the task hasn't been executed yet",
-                                    "Subtask_Status": "Successful or Unsuccessful; this may be blank if the task hasn't been executed yet"
-                                }},
-                                {{
-                                    "Sub_Task": "Description of Subtask 2",
-                                    "Agent": "Agent Name",
-                                    "Agent_Function": "The agent function to be used to execute the task",
-                                    "Sub_Task_Output": "The overall output of the subtask if it was successful or not, this may be blank if the task hasn't been executed yet",
-                                    "Sub_Task_Output_Observation": "The thought and observation of the overall success of the subtask, this may be blank if the task hasn't been executed yet",
-                                    "Subtask_Status": "Successful or Unsuccessful; this may be blank if the task hasn't been executed yet"
-                                }}
-                                // all other subtasks for Task 1
-                            ]
-                        }},
-                        {{
-                            "Task": "Description of Task 2",
-                            "Task_Output": "The overall output if the task was successful or not, this may be blank if the task hasn't been executed yet.",
-                            "Task_Output_Observation": "The thought and observation of the overall success of the tasks",
-                            "Task_Status": "Successful, Unsuccessful, or In Progress; this may be blank if the task hasn't been executed yet. Must be In Progress if a sub-task is In Progress, can only change to Sucessful if all sub-task are sucessful",
-                            "Sub_Tasks": [
-                                // all other Subtasks for Task 2
-                            ]
-                        }}
-                        // All other Tasks 
-                    ],
-                    "Overall_execution_of_the_plan": "In-Progress or Completed. When all sub-tasks have been executed, either successful or not successful, you must change this to Completed"
-                }}
-                ```
-                ##Short-Term Memory
-                ```json
-                {{
-                "st_memory": {{
-                    "Thought": "The initial idea",
-                    "Action": "The action taken",
-                    "Observation": "The observed output"
-                }}
-                }}
-                ```
-                ##Long-Term Memory
-                ```json
-                {{
-                "lt_memory": {{
-                    "Thought": "The overall idea",
-                    "Action": "The overall action taken",
-                    "Observation": "The overall observed output"
-                }}
-                }}
-                ```
-                """
+        if state.Current_Task is None:
+            return self._stalled("output", "The conductor did not select a subtask to run")
+
+        system_prompt = self._conductor_prompt(prompts.TASKS_OUTPUT_LOOP_SYSTEM_PROMPT)
+        prompt_content = prompts.tasks_output_loop_state(self._prompt_json(state.Current_Task), self._prompt_json(state.Agent_Input), self._prompt_json(state.Plan), self._memory_json(state, "Short_Term"), self._memory_json(state, "Long_Term"))
         try:
-            loading_placeholder = self.st.empty()
-            with self.st.spinner("Processing your query and generating initial agent composition and plan..."):  
-                completion = self.client.beta.chat.completions.parse(
-                    model=self.model,
-                messages=[
-                        {"role": "user", "content": prompt_content}
-                    ],
-                    response_format=self.pydantic_models.OverallResponse1,  # Adjust if AI Conductor has a different response structure
-                )
-            loading_placeholder.empty()
-
-            event = completion.choices[0].message.parsed
+            event = yield from self._parse(prompt_content, self._conductor_format(self.pydantic_models.OverallResponse2), system_prompt=system_prompt, phase="output")
 
             # Debug: Print the AI Conductor's response
-            print("----- Phase 4: AI Conductor Input 2 Loop-----")
-            #print(event)
-            plan = event.Plan
-            current_task = event.Current_Task
-            agent_input = event.Agent_Input
-            st_memory = event.Short_Term_Memory
-            lt_memory = event.Long_Term_Memory
-
-            # Serialize the extracted data to JSON strings
-            current_task_json = current_task.model_dump_json(indent=2)
-            agent_input_json = agent_input.model_dump_json(indent=2)
-
-            plan_json = plan.model_dump_json(indent=2)
-            st_memory_json = st_memory.model_dump_json(indent=2)
-            lt_memory_json = lt_memory.model_dump_json(indent=2)
-
-            return current_task_json, agent_input_json, plan_json, st_memory_json, lt_memory_json
+            print("----- Phase 4: AI Conductor Output Loop -----")
+            return self._emit("agent_output", self._next_state(state, event))
 
         except BadRequestError as e:
             print(f"API Request Failed: {e}")
-        except Exception as e: 
+            self._emit_error("output", e)
+        except Exception as e:
             print(f"An unexpected error occurred: {e}")
+            self._emit_error("output", e)
 
-    def orchestrate_tasks_output_loop(self, current_task_json, agent_input_json, plan_json, st_memory_json, lt_memory_json):
-        if not all([current_task_json, agent_input_json, plan_json, st_memory_json, lt_memory_json]):
-            print("Missing required inputs for AI Conductor.")
+    # ------------------- Fused step: AI Conductor Input + Output in one call -------------------
+
+    @driven
+    def orchestrate_tasks_step(self, state):
+        if not self._has_plan(state):
             return
 
-        prompt_content = f"""You are the AI Conductor, responsible for orchestrating a team of specialized AI agents to achieve the user's goals effectively.
-
-                                ### Instructions:
-                                1. **Plan Execution**: 
-                                - Receive a plan with tasks and subtasks, specifying the agent and function for each.
-                                - Track the output and status of each task and subtask. Must be Successful, Unsuccessful, or In Progress.
-                                - When all subtasks are Completed or Sucessful, update the  'Task', 'Task_Output', 'Task_Output_Observation', 'Task_Status' to Successful.
-                                - when all task_status are Successfull or Completed, update the 'Overall execution of the plan' to Successful. Do not continue or make up a new agent or request.
-                                - Manage communication between agents.
-                                - Always output the Agent Output, Plan (Plan (including the 'Overall execution of the plan'), Short-Term Memory, Long-Term Memory, Next Task and Next Agent Input
-                                - If subtask status or task status is Successful or Completed, you may move on the the next agent in the plan and update the next agent and next input agent, if unsuccessful you may call the same task again with another agent_input.
-                                - if there are no tasks left or next agent input is none, or all tasks in the current plan have been completed, you must update 'Overall execution of the plan' to Successful
-                                - the agent_output MUST generate very detailed synthetic data that can help with the task being executed. It should contain the RAW synthetic data.
-                                - The subtask being executed, must now be Sucessful, unless it failed and the next subtask must be set to In Progress.
-
-                        2. **Memory Utilization**:
-                        - **Short-Term Memory**: Orchestrate and execute the current plan, recording thoughts, actions, and observations.
-                        - **Long-Term Memory**: Maintain overall orchestration details and learnings from past plans to optimize future executions.
-
-            ### JSON Formatting:
-            - Enclose all JSON content within triple backticks and specify as `json`.
-            - Start each section with `##` followed by the section name.
-            - Ensure all JSON objects and arrays are properly closed with matching braces and commas.
-            - Use double quotes for all keys and string values.
-            - Do not include extra text outside the JSON sections.
-            - Keep responses concise to avoid exceeding token limits.
-            - Do not add unnecessary carriage returns.
-
-            ### Critical JSON Formatting Rules:
-            - All JSON objects and arrays must have matching braces.
-            - Separate all key-value pairs with commas.
-            - Use double quotes for both keys and string values.
-            - Avoid trailing commas after the last key-value pair.
-            - Validate JSON formatting before outputting.
-
-            ### INSTRUCTION
-            - Always output the Current Task, Agent Input, Plan, Short-Term Memory and Long-Term Memory
-
-            ##Current Task
-            ```json
-            {current_task_json}
-            ```
-            ##Agent Input
-            ```json
-            {agent_input_json}
-            ```
-            ##Plan
-            ```json
-            {plan_json}
-            ```
-
-            ##Short-Term Memory
-            ```json
-            {st_memory_json}
-            ```
-
-            ##Long-Term Memory
-            ```json
-            {lt_memory_json}
-            ```
-
-            #OUTPUTS:
-            
-            ##Agent Output 
-            ```json
-                {{
-                "Agent_Output": {{
-                    "agent_output": "Always use the Task_Output data from the previous task and  generate detailed synthetic data that can help with the task being executed. If the query is a database query, the agent_output MUST generate synthetic raw data retrieved from a database"  
-                    "Agent": "The agent that executed the task",
-                    "Agent Function": "the function executed"
-                    }}
-                }}
-            ```
-            ##Plan (the plan to be executed)
-                ```json
-                {{
-                    "Tasks": [
-                        {{
-                            "Task": "Description of Task 1",
-                            "Task_Output": "The overall output if the task was successful or not, this may be blank if the task hasn't been executed yet.",
-                            "Task_Output_Observation": "The thought and observation of the overall success of the tasks",
-                            "Task_Status": "Successful, Unsuccessful, or In Progress; this may be blank if the task hasn't been executed yet. Must be In Progress if a sub-task is In Progress, can only change to Sucessful if all sub-task are sucessful",
-                            "Sub_Tasks": [
-                                {{
-                                    "Sub_Task": "Description of Subtask 1",
-                                    "Agent": "Agent Name",
-                                    "Agent_Function": "The agent function to be used to execute the task",
-                                    "Sub_Task_Output": "The overall output of the subtask if it was successful or not, this may be blank if the task hasn't been executed yet",
-                                    "Sub_Task_Output_Observation": "The thought and observation of the overall success of the subtask, this may be blank if the task hasn't been executed yet",
-                                    "Subtask_Status": "Successful or Unsuccessful; this may be blank if the task hasn't been executed yet"
-                                }},
-                                {{
-                                    "Sub_Task": "Description of Subtask 2",
-                                    "Agent": "Agent Name",
-                                    "Agent_Function": "The agent function to be used to execute the task",
-                                    "Sub_Task_Output": "The overall output of the subtask if it was successful or not, this may be blank if the task hasn't been executed yet",
-                                    "Sub_Task_Output_Observation": "The thought and observation of the overall success of the subtask, this may be blank if the task hasn't been executed yet",
-                                    "Subtask_Status": "Successful or Unsuccessful; this may be blank if the task hasn't been executed yet"
-                                }}
-                                // all other subtasks for Task 1
-                            ]
-                        }},
-                        {{
-                            "Task": "Description of Task 2",
-                            "Task_Output": "The overall output if the task was successful or not, this may be blank if the task hasn't been executed yet.",
-                            "Task_Output_Observation": "The thought and observation of the overall success of the tasks",
-                            "Task_Status": "Successful, Unsuccessful, or In Progress; this may be blank if the task hasn't been executed yet. Must be In Progress if a sub-task is In Progress, can only change to Sucessful if all sub-task are sucessful",
-                            "Sub_Tasks": [
-                                // all other Subtasks for Task 2
-                            ]
-                        }}
-                        // All other Tasks 
-                    ],
-                    "Overall_execution_of_the_plan": "In-Progress or Completed. When all sub-tasks have been executed, either successful or not successful, you must change this to Completed"
-                }}
-                ```
-                ##Short-Term Memory
-                ```json
-                {{
-                "st_memory": {{
-                    "Thought": "The initial idea",
-                    "Action": "The action taken",
-                    "Observation": "The observed output"
-                }}
-                }}
-                ```
-                ##Long-Term Memory
-                ```json
-                {{
-                "lt_memory": {{
-                    "Thought": "The overall idea",
-                    "Action": "The overall action taken",
-                    "Observation": "The overall observed output"
-                }}
-                }}
-                ```
-                ##Next Task
-                ```json
-                {{  
-                "Task": {{  
-                    "Task": "The next task to execute",  
-                    "Subtask": "The next subtask to execute"
-                    }}  
-                }}
-                ```
-                ##Next Agent Input
-                ```json
-                {{
-                    "Agent_Input": {{
-                        "agent_input": "The next task for the agent to execute",
-                        "Agent": "The agent that will execute the task",
-                        "Agent_Function": "The function that the agent will execute for the task"
-                        }}
-                }}
-                ```
-                """
+        system_prompt = self._conductor_prompt(prompts.TASKS_STEP_SYSTEM_PROMPT)
+        prompt_content = prompts.tasks_step_state(self._prompt_json(state.Agent_Output), self._prompt_json(state.Plan), self._memory_json(state, "Short_Term"), self._memory_json(state, "Long_Term"), self._prompt_json(state.Next_Task, FIRST_STEP_TASK_JSON), self._prompt_json(state.Next_Agent_Input))
         try:
-            loading_placeholder = self.st.empty()
-            loading_placeholder = self.st.empty()
-            with self.st.spinner("Processing your query and generating initial agent composition and plan..."):
-                completion = self.client.beta.chat.completions.parse(
-                    model=self.model,
-                messages=[
-                    {"role": "user", "content": prompt_content}
-                ],
-                response_format=self.pydantic_models.OverallResponse2,  # Adjust if AI Conductor has a different response structure
-            )
-            loading_placeholder.empty()
-
-            event = completion.choices[0].message.parsed
+            event = yield from self._parse(prompt_content, self._conductor_format(self.pydantic_models.OverallResponse3), "Selecting the next subtask, executing the agent and updating the plan...", system_prompt=system_prompt, phase="step")
 
-            # Debug: Print the AI Conductor's response
-            print("----- Phase 3: AI Conductor Output -----")
-            #print(event)
-            agent_output = event.Agent_Output
-            plan = event.Plan
-            st_memory = event.Short_Term_Memory
-            lt_memory = event.Long_Term_Memory
-            next_task = event.Next_Task
-            next_agent_input = event.Next_Agent_Input
-
-            # Serialize the extracted data to JSON strings
-            agent_output_json = agent_output.model_dump_json(indent=2)
-            plan_json = plan.model_dump_json(indent=2)
-            st_memory_json = st_memory.model_dump_json(indent=2)
-            lt_memory_json = lt_memory.model_dump_json(indent=2)
-            next_task_json = next_task.model_dump_json(indent=2)
-            next_agent_input_json = next_agent_input.model_dump_json(indent=2)
-
-            return agent_output_json, plan_json, st_memory_json, lt_memory_json, next_task_json, next_agent_input_json
+            print("----- Phase 4: AI Conductor Fused Step -----")
+            state = self._next_state(state, event)
+            self._emit("step_started", state)
+            return self._emit("agent_output", state)
 
         except BadRequestError as e:
             print(f"API Request Failed: {e}")
-        except Exception as e: 
+            self._emit_error("step", e)
+        except Exception as e:
             print(f"An unexpected error occurred: {e}")
+            self._emit_error("step", e)
+
+    # ------------------- Parallel step: every ready subtask at once -------------------
 
+    @driven
+    def orchestrate_tasks_parallel(self, state):
+        if not self._has_plan(state):
+            return
 
-    def summarize_final_output(self, plan_json, st_memory_json, lt_memory_json, st_tools):
-        user_message = f""""Summarize the output of the entire plan and explain everything that you did to generate a final response and solution. Provide the response like it was the planner agent speaking back to the user. Agent Input: {plan_json}
-                        
-                        ### HTML Formatting:
-                        - Provide a header using a `<span>` with specific styles.
-                        - Ensure all HTML tags are properly closed.
-                        - Do not include HTML within JSON sections.
-                        
-                        Generate a chatbot message using markdown that includes an agent's message with a formatted example plan similar to the one below:
+        ready = ready_subtasks(state.Plan)[:self.max_parallel]
+        if not ready:
+            return self._no_ready_subtasks()
+        with self.sink.spinner(f"Running {len(ready)} subtask(s) in parallel..."):
+            results = yield functools.partial(self._run_subtasks, state, ready)
 
-                        **Important:** Do not include any code blocks or triple backticks in your response. Provide the content as plain markdown. 
+        print("----- Phase 4: AI Conductor Parallel Step -----")
+        state = self._parallel_state(state, ready, results)
+        if state is None:
+            return
+        self._emit("step_started", state)
+        return self._emit("agent_output", state)
 
-                        Example:
+    def _run_subtasks(self, state, ready):
+        with ThreadPoolExecutor(max_workers=len(ready), thread_name_prefix="mas-subtask") as executor:
+            return list(executor.map(lambda item: self._drive(self._run_subtask(state, *item)), ready))
 
-                        The goal was to find the lowest price for an Xbox. The approach included identifying popular e-commerce websites, fetching and comparing prices, finding discounts, and re-evaluating to arrive at the lowest price after applying discounts. The expected outcome was to determine the best possible price across the identified websites.
+    def _run_subtask(self, state, task, subtask):
+        messages = self._subtask_messages(state, task, subtask)
+        response_format = self.pydantic_models.SubTaskResult
+        try:
+            completion = yield from self._with_retries("agent", "parse", self.model, messages, lambda trace: self._call_parse(trace, messages, response_format))
+            return completion.choices[0].message.parsed
 
-                        🛠️ Agents and Task Execution Summary
+        except BadRequestError as e:
+            print(f"API Request Failed: {e}")
+            self._emit_error("agent", e)
+        except Exception as e:
+            print(f"An unexpected error occurred: {e}")
+            self._emit_error("agent", e)
 
-                        Task	Agent	Function	Status	Output
-                        🔍 Identify popular e-commerce websites	WebsiteIdentifierAgent	identifyWebsites	✅ Successful	Successfully identified popular e-commerce websites: Amazon, eBay, Walmart, Best Buy, Target.
-                        🛒 Search for Xbox on identified websites	PriceFetcherAgent	fetchPrices	✅ Successful	Fetched prices from Amazon (349.99), eBay (340.0), Walmart (342.5), Best Buy (345.99), Target (348.0).
-                        📊 Compare the prices fetched	PriceComparerAgent	comparePrices	✅ Successful	eBay has the lowest price: 340.0.
-                        🏷️ Find discount codes or offers on websites	DiscountFinderAgent	findDiscounts	✅ Successful	Found discount codes on Amazon (SAVE10 for $10 off).
-                        💸 Apply discounts and re-evaluate the lowest price	PriceReevaluationAgent	reevaluatePricesWithDiscounts	✅ Successful	After applying the discount, Amazon has the lowest price: 339.99.
-                        📋 Generate final report of the lowest price for Xbox	ReportGeneratorAgent	generateReport	✅ Successful	The lowest price for Xbox, after applying discounts, is 339.99 at Amazon.
+    # ------------------- Local scheduler: the next subtask is picked from the plan -------------------
 
-                                        
-                        🏁 Overall Execution Summary
+    @driven
+    def orchestrate_tasks_scheduled(self, state):
+        if not self._has_plan(state):
+            return
 
-                        The process began by identifying major e-commerce platforms where an Xbox could be purchased. Prices were gathered for the Xbox from each site, revealing that eBay initially offered the lowest price. However, a discount code found for Amazon changed the dynamics. By applying the SAVE10 discount on Amazon, the price dropped below eBay's offer.
-                        By re-evaluating the prices with available discounts, it was concluded that Amazon provides the best deal at $339.99. The final report encapsulates this finding, advising that purchasing the Xbox from Amazon after applying the discount code yields the lowest price.
-                        This systematic approach ensured all potential savings were considered, guiding the consumer to make an informed purchasing decision.
-                        """
+        item = next_subtask(state.Plan)
+        if item is None:
+            return self._no_ready_subtasks()
+        task, subtask = item
+        agent_input = self._scheduled_agent_input(state, task, subtask)
         try:
-            completion = self.client.chat.completions.create(
-                model="GPT4o",  # Replace with your actual model deployment name
-                messages=[
-                    {"role": "user", "content": user_message}
-                ],
-            )
-
-            event = completion.choices[0].message
-            self.st.markdown(event.content, unsafe_allow_html=True)
-
-            self.st.session_state.plan = plan_json if 'plan_json' in locals() else {}
-            self.st.session_state.st_memory = st_memory_json if 'st_memory_json' in locals() else {}  
-            self.st.session_state.lt_memory = lt_memory_json if 'lt_memory_json' in locals() else {} 
-
-            if 'plan_json' in locals() and plan_json:  
-                self.st.session_state.plan = plan_json   
-                st_tools.update_sidebar(plan_json, self.st, self.sidebar_placeholder) 
-
-
-            self.st.markdown(  
-                """  
-                <hr style="border: none; height: 2px; background-color: white; width: 50%; margin-left: auto; margin-right: auto;">  
-                """,  
-                unsafe_allow_html=True  
-            )  
-    
-            return event.content
+            result = yield from self._parse(self._scheduled_prompt(state, task, subtask, agent_input), self.pydantic_models.AgentResult, f"Running {subtask.Agent}.{subtask.Agent_Function} for {subtask.Sub_Task}...", system_prompt=prompts.SCHEDULED_AGENT_SYSTEM_PROMPT, phase="agent")
+        except BadRequestError as e:
+            print(f"API Request Failed: {e}")
+            self._emit_error("agent", e)
+            return
+        except Exception as e:
+            print(f"An unexpected error occurred: {e}")
+            self._emit_error("agent", e)
+            return
+
+        print("----- Phase 4: Local Scheduler Step -----")
+        result = self.pydantic_models.SubTaskResult(Agent_Input=agent_input, Agent_Output=result.Agent_Output, Sub_Task_Output_Observation=result.Sub_Task_Output_Observation, Subtask_Status=result.Subtask_Status)
+        next_state = self._parallel_state(state, [item], [result])
+        if subtask_failed(result) and state.Replans < self.max_replans:
+            next_state = yield from self._replan(next_state, task, subtask, result)
+        self._emit("step_started", next_state)
+        return self._emit("agent_output", next_state)
+
+    def _replan(self, state, task, subtask, result):
+        # A failed revision leaves the plan as it is; the failed subtask then counts as run and the plan moves on
+        try:
+            event = yield from self._parse(self._replan_prompt(state, task, subtask, result), self.pydantic_models.OverallResponse, "Revising the plan after a failed subtask...", system_prompt=prompts.REPLAN_SYSTEM_PROMPT, phase="replan")
+        except Exception as e:
+            print(f"Could not revise the plan: {e}")
+            self._emit_error("replan", e)
+            event = None
+        return self._replanned_state(state, event)
+
+    # ------------------- Phase 5: Final summary -------------------
+
+    @driven
+    def summarize_final_output(self, state):
+        user_message = prompts.final_output_prompt(self._prompt_json(state.Plan))
+        try:
+            content = self._emit_message("summary", (yield from self._narrate(user_message, model="GPT4o", phase="summary")), state)  # Replace with your actual model deployment name
+            self._emit("plan_completed", state, final_output=content)
+            self._save_run(state)
+            return content
 
         except BadRequestError as e:
             print(f"API Request Failed: {e}")
-            return None, None, None
+            self._emit_error("summary", e)
         except Exception as e:
             print(f"An unexpected error occurred: {e}")
-            return None, None, None
+            self._emit_error("summary", e)
+
+    # ------------------- Plan run: plan -> conductor steps -> final summary -------------------
+
+    @driven
+    def run(self, industry, use_case, user_query, state=None, max_steps=DEFAULT_MAX_STEPS, on_step=None):
+        # The whole run, as the app's background jobs, the benchmark, the headless runner and the HTTP service drive it.
+        # A state passed in (from a checkpoint) resumes the run after its last completed step. on_step(step) is called
+        # once the plan ("plan"), each step (its number) and the summary ("summary") are done, narration included.
+        # Returns status ("completed", "failed", "max_steps" or "max_tokens"), steps, plan, final_output and tokens; a
+        # failed run also has the phase and the error it stopped on
+        result = {"status": "failed", "steps": 0, "plan": None, "final_output": None}
+        on_step = on_step or (lambda step: None)
+        try:
+            if state is None:
+                state = yield functools.partial(self.get_initial_plan, industry, use_case, user_query)
+                if state is not None:
+                    yield functools.partial(self.dispatch_message, self.get_initial_plan_message, state)
+                on_step("plan")
+
+            while state is not None:
+                result.update(steps=state.Steps, plan=state.Plan.model_dump(mode="json"))
+                # Checked before every step, so a plan that is done (or resumed once done) goes straight to the summary
+                if plan_completed(state.Plan):
+                    print("Plan execution completed.")
+                    yield self.wait_for_messages
+                    final_output = yield functools.partial(self.summarize_final_output, state)
+                    on_step("summary")
+                    if final_output is not None:
+                        result.update(status="completed", final_output=final_output)
+                    break
+                # Stops a plan the model never finishes, by steps or by tokens spent
+                exhausted = self.budget_exhausted(state, max_steps)
+                if exhausted is not None:
+                    result["status"] = exhausted
+                    self._emit("run_stopped", state, status=exhausted)
+                    break
+                step = state.Steps + 1
+                state = yield from self._step(state)
+                on_step(step)
+
+            # Keep what was rendered so far when retries are exhausted
+            yield self.wait_for_messages
+            result["tokens"] = self.tokens_used
+            if result["status"] == "failed" and self.last_error is not None:
+                result["error_phase"], result["error"] = self.last_error
+            return result
+        finally:
+            # The narration worker of a pipelined run is not left behind once the run is over
+            self._shutdown_messages()
+
+    def _step(self, state):
+        # One conductor step with its narration messages
+        if self.parallel_subtasks or self.local_scheduler or self.fused_step:
+            if self.parallel_subtasks:
+                state = yield functools.partial(self.orchestrate_tasks_parallel, state)
+            elif self.local_scheduler:
+                state = yield functools.partial(self.orchestrate_tasks_scheduled, state)
+            else:
+                state = yield functools.partial(self.orchestrate_tasks_step, state)
+            if state is not None:
+                yield functools.partial(self.dispatch_message, self.orchestrate_tasks_input_message, state)
+        else:
+            # The first step starts from the plan, the following ones from the Next Task of the previous step
+            first_step = state.Steps == 0
+            state = yield functools.partial(self.orchestrate_tasks_input if first_step else self.orchestrate_tasks_input_loop, state)
+            if state is not None:
+                yield functools.partial(self.dispatch_message, self.orchestrate_tasks_input_message, state)
+                state = yield functools.partial(self.orchestrate_tasks_output if first_step else self.orchestrate_tasks_output_loop, state)
+        if state is not None:
+            yield functools.partial(self.dispatch_message, self.orchestrate_tasks_output_message, state)
+        return state
+
+
+class AsyncMAS_orchestrator(MAS_orchestrator):
+    # Same phases, prompts, response models, events and run states as MAS_orchestrator; only the calls the phases yield
+    # are awaited, on an AsyncAzureOpenAI client, so many plan runs can share one event loop and one HTTP connection pool.
+    def __init__(self, client, model, pydantic_models, fused_step=False, stream_messages=False, pipelined=False, plan_delta=False, sink=None, retry_policy=None, rate_limiter=None, scheduler=None, parallel_subtasks=False, max_parallel=4, local_scheduler=False, max_replans=2, memory_manager=None, memory_store=None, max_tokens=None):
+        super().__init__(client, model, pydantic_models, fused_step=fused_step, stream_messages=stream_messages, pipelined=pipelined, plan_delta=plan_delta, sink=sink, retry_policy=retry_policy, rate_limiter=rate_limiter, scheduler=scheduler, parallel_subtasks=parallel_subtasks, max_parallel=max_parallel, local_scheduler=local_scheduler, max_replans=max_replans, memory_manager=memory_manager, memory_store=memory_store, max_tokens=max_tokens)
+
+    async def _drive(self, phase):
+        result, error = None, None
+        try:
+            while True:
+                try:
+                    call = phase.throw(error) if error is not None else phase.send(result)
+                except StopIteration as stop:
+                    return stop.value
+                try:
+                    result, error = call(), None
+                    # Client calls return coroutines on the async client; a call without an awaitable form just runs
+                    if inspect.isawaitable(result):
+                        result = await result
+                except Exception as e:
+                    result, error = None, e
+        finally:
+            phase.close()
+
+    def _sleep(self, seconds):
+        return asyncio.sleep(seconds)
+
+    def _acquire(self, tokens, priority):
+        return self.scheduler.acquire_async(tokens, priority)
+
+    def _next_chunk(self, stream):
+        return anext(stream, None)
+
+    def dispatch_message(self, message_fn, *args):
+        if not self.pipelined:
+            return message_fn(*args)
+        # A task per message instead of the worker thread: the conductor call of the next step goes on while it runs
+        previous = self.pending_messages[-1] if self.pending_messages else None
+        self.pending_messages.append(asyncio.ensure_future(self._render_message_after(previous, message_fn, args)))
+
+    async def _render_message_after(self, previous, message_fn, args):
+        # Each message waits for the one before it to finish, so the messages keep plan order like on the single
+        # worker thread; a failed message is reported by wait_for_messages, not by the next one
+        if previous is not None:
+            await asyncio.wait([previous])
+        user_message = await message_fn(*args)
+        print(user_message)
+        return user_message
+
+    async def wait_for_messages(self):
+        pending, self.pending_messages = self.pending_messages, []
+        for task in pending:
+            await task
+
+    def _shutdown_messages(self):
+        # A run that is cancelled or fails before its last wait does not leave narration tasks running
+        for task in self.pending_messages:
+            task.cancel()
+        self.pending_messages = []
+
+    def _run_subtasks(self, state, ready):
+        return asyncio.gather(*[self._drive(self._run_subtask(state, task, subtask)) for task, subtask in ready])
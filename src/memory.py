@@ -0,0 +1,73 @@
+from src.pydantic_models import MemoryEntry, MemoryLog
+
+# Bounded short-term and long-term memory. The conductor rewrites both memories every step and they are resent in
+# every prompt, so left alone they grow with the plan. With a MemoryManager the orchestrator records each step's
+# memory in a MemoryLog per tier and the prompts carry the log instead:
+#   Recent   the last few entries, verbatim (the newest one is the memory the conductor just wrote)
+#   Summary  older entries compacted into one extractive summary; when it is cut, the oldest part goes first
+# Each tier has a token budget; once the log exceeds it, the oldest recent entries are folded into the summary, so the
+# prompt size levels off instead of growing with every step.
+
+FIELDS = ["Thought", "Action", "Observation"]
+ELLIPSIS = "…"
+
+
+def estimate_tokens(text):
+    # About four characters per token, like the scheduler's estimate
+    return len(text or "") // 4
+
+
+def _last_sentence(text):
+    # The conductor tends to append to the memory it wrote the step before, so the newest information comes last
+    text = (text or "").strip()
+    start = text.rstrip(".").rfind(". ")
+    return text[start + 2:] if start != -1 else text
+
+
+def _cut(text, tokens):
+    # Keeps the end of the text, where the newest information is
+    limit = max(1, tokens) * 4
+    if text is None or len(text) <= limit:
+        return text
+    return ELLIPSIS + text[-(limit - 1):]
+
+
+class MemoryManager:
+    def __init__(self, short_term_tokens=800, long_term_tokens=400, recent_entries=3):
+        self.budgets = {"Short_Term": short_term_tokens, "Long_Term": long_term_tokens}
+        self.recent_entries = recent_entries
+
+    def record(self, log, memory, tier):
+        # Returns the new MemoryLog of the tier with memory as its newest entry; log is left untouched
+        budget = self.budgets[tier]
+        entry = self._fit(MemoryEntry(**memory.model_dump(include=set(FIELDS))), budget // 2)
+        summary = log.Summary if log is not None else None
+        recent = list(log.Recent) if log is not None else []
+        # The long-term memory often comes back unchanged; an identical entry adds nothing
+        if not recent or recent[-1] != entry:
+            recent.append(entry)
+
+        older = []
+        while len(recent) > self.recent_entries or (len(recent) > 1 and self._tokens(summary, recent) > budget):
+            older.append(recent.pop(0))
+        if older:
+            summary = self._summarize(summary, older, max(budget // 4, budget - self._tokens(None, recent)))
+        return MemoryLog(Summary=summary, Recent=recent)
+
+    def _fit(self, entry, tokens):
+        # A single entry may take at most its share of the budget; very long fields keep their newest part
+        per_field = max(1, tokens // len(FIELDS))
+        return MemoryEntry(**{field: _cut(getattr(entry, field), per_field) for field in FIELDS})
+
+    def _summarize(self, summary, entries, tokens):
+        # Extractive: the action and the last sentence of the observation of every folded entry
+        lines = [summary] if summary else []
+        for entry in entries:
+            line = " - ".join(part for part in (entry.Action, _last_sentence(entry.Observation)) if part)
+            if line:
+                lines.append(line)
+        # When the summary itself gets too long, the oldest part goes first
+        return _cut(" | ".join(lines), tokens) or None
+
+    def _tokens(self, summary, recent):
+        return estimate_tokens(summary) + sum(estimate_tokens(entry.model_dump_json(exclude_none=True)) for entry in recent)
@@ -0,0 +1,97 @@
+import array, hashlib, math, operator, re, sqlite3, threading, time
+
+# Persistent long-term memory across runs. When a plan completes, the orchestrator saves the plan outline, the agent
+# outputs and the final long-term memory (the lessons of the run) to a local sqlite file, tagged with the industry and
+# use case. The planner of a later run gets only the top-k entries most relevant to its request, not the whole history.
+# Relevance is the cosine similarity of hashed bag-of-words vectors, kept in memory next to the sqlite rows, plus a
+# bonus for entries of the same industry and use case.
+#
+#   store = LongTermStore(".mas_memory.sqlite")
+#   MAS_orchestrator(client, model, pydantic_models, memory_store=store)
+
+DEFAULT_STORE_PATH = ".mas_memory.sqlite"
+DEFAULT_TOP_K = 3
+DIMENSIONS = 512
+# Added to the similarity of entries recorded for the same industry or the same use case
+SAME_INDUSTRY_BONUS = 0.15
+SAME_USE_CASE_BONUS = 0.15
+# Agent outputs are kept as a short excerpt, enough to recall what the agent produced
+MAX_TEXT_CHARS = 600
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _normalize(value):
+    return (value or "").strip().casefold()
+
+
+def embed(text):
+    # Feature hashing of words and word pairs into a fixed-size, L2-normalized vector
+    words = WORD_RE.findall(text.lower())
+    vector = array.array("f", [0.0]) * DIMENSIONS
+    for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "little") % DIMENSIONS
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(value * value for value in vector))
+    if norm:
+        for index in range(DIMENSIONS):
+            vector[index] /= norm
+    return vector
+
+
+class LongTermStore:
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS memories (id INTEGER PRIMARY KEY, industry TEXT NOT NULL, use_case TEXT NOT NULL, query TEXT NOT NULL, kind TEXT NOT NULL, text TEXT NOT NULL, vector BLOB NOT NULL, created REAL NOT NULL)")
+        self.conn.commit()
+        # In-process index: (id, industry, use_case, vector) of every stored entry
+        self.index = []
+        for entry_id, industry, use_case, blob in self.conn.execute("SELECT id, industry, use_case, vector FROM memories"):
+            self.index.append((entry_id, industry, use_case, array.array("f", blob)))
+
+    def add(self, industry, use_case, query, kind, text):
+        vector = embed(f"{industry} {use_case} {query} {text}")
+        with self.lock:
+            # Repeat runs often end with the same lessons; one copy is enough for retrieval
+            if self.conn.execute("SELECT 1 FROM memories WHERE industry = ? AND use_case = ? AND kind = ? AND text = ?", (_normalize(industry), _normalize(use_case), kind, text)).fetchone():
+                return
+            cursor = self.conn.execute(
+                "INSERT INTO memories (industry, use_case, query, kind, text, vector, created) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (_normalize(industry), _normalize(use_case), query, kind, text, vector.tobytes(), time.time()),
+            )
+            self.conn.commit()
+            self.index.append((cursor.lastrowid, _normalize(industry), _normalize(use_case), vector))
+
+    def save_run(self, state):
+        # Called once a plan has completed: its outline, the agent outputs and the lessons in the long-term memory
+        industry, use_case, query, plan = state.Industry, state.Use_Case, state.Query or "", state.Plan
+        outline = "; ".join(f"{task.Task}: " + ", ".join(f"{subtask.Sub_Task} ({subtask.Agent}.{subtask.Agent_Function})" for subtask in task.Sub_Tasks or []) for task in plan.Tasks)
+        self.add(industry, use_case, query, "plan", outline)
+        for task in plan.Tasks:
+            for subtask in task.Sub_Tasks or []:
+                if subtask.Sub_Task_Output:
+                    self.add(industry, use_case, query, "agent_output", f"{subtask.Agent}.{subtask.Agent_Function} for {subtask.Sub_Task}: {subtask.Sub_Task_Output[:MAX_TEXT_CHARS]}")
+        lessons = " ".join(part for part in (state.Long_Term_Memory.Thought, state.Long_Term_Memory.Action, state.Long_Term_Memory.Observation) if part)
+        if lessons:
+            self.add(industry, use_case, query, "lesson", lessons)
+
+    def search(self, industry, use_case, query, k=DEFAULT_TOP_K):
+        # Returns the k most relevant entries as dicts with kind, industry, use_case, query and text
+        vector = embed(f"{industry} {use_case} {query}")
+        industry, use_case = _normalize(industry), _normalize(use_case)
+        with self.lock:
+            scored = []
+            for entry_id, entry_industry, entry_use_case, entry_vector in self.index:
+                score = sum(map(operator.mul, vector, entry_vector))
+                score += SAME_INDUSTRY_BONUS if entry_industry == industry else 0.0
+                score += SAME_USE_CASE_BONUS if entry_use_case == use_case else 0.0
+                scored.append((score, entry_id))
+            top = sorted(scored, reverse=True)[:k]
+            rows = {row[0]: row for row in self.conn.execute(
+                f"SELECT id, kind, industry, use_case, query, text FROM memories WHERE id IN ({','.join('?' * len(top))})", [entry_id for _, entry_id in top]
+            )} if top else {}
+        return [{"kind": rows[entry_id][1], "industry": rows[entry_id][2], "use_case": rows[entry_id][3], "query": rows[entry_id][4], "text": rows[entry_id][5]} for _, entry_id in top if entry_id in rows]
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,291 @@
+import asyncio, hashlib, json, random, re, threading, time
+from types import SimpleNamespace
+
+from src.pydantic_models import Plan
+
+# Offline stand-in for the Azure OpenAI client. MockClient / AsyncMockClient implement the two calls the orchestrator
+# makes, beta.chat.completions.parse and chat.completions.create (streamed or not), with no network:
+#   - parse returns a response_format instance built from the state sections of the prompt: the planner gets a fresh
+#     plan, the conductor phases mark the current subtask In Progress, then Successful, and the plan Completed once
+#     every subtask has run, so the conductor loop terminates.
+#   - in parallel and local scheduler modes, a subtask run returns a Successful result for the subtask it was given;
+#     the plan declares the subtasks of a task independent of each other, each depending on every subtask of the task
+#     before it.
+#   - create returns filler narration of a fixed number of tokens.
+# Each call sleeps latency (time to first token) plus completion tokens / tokens_per_second.
+#
+#   python -m src.runner scenarios.jsonl --mock --mock-latency 0.5 --mock-tokens-per-second 80
+
+DONE_STATUSES = ["successful", "completed"]
+MOCK_AGENTS = [("ResearchAgent", "gather_information"), ("AnalysisAgent", "analyze_data"), ("PlanningAgent", "draft_plan"), ("ReportAgent", "write_report")]
+SECTION_RE = re.compile(r"##([^\n`]+)\n\s*```json\n(.*?)\n\s*```", re.S)
+FILLER_WORDS = "the agent reviewed the plan collected the data and prepared a short summary of the results for the user".split()
+
+
+def _tokens(text):
+    # Rough estimate, about four characters per token
+    return max(1, len(text) // 4)
+
+
+def _sections(messages):
+    state = messages[-1]["content"]
+    return {name.strip(): body for name, body in SECTION_RE.findall(state)}
+
+
+def _done(status):
+    return (status or "").lower() in DONE_STATUSES
+
+
+def _pending(plan):
+    return [(task, subtask) for task in plan.Tasks for subtask in task.Sub_Tasks if not _done(subtask.Subtask_Status)]
+
+
+def _select(plan, requested):
+    # The subtask the conductor was asked for, or the first one that has not run yet
+    pending = _pending(plan)
+    if requested is not None:
+        for task, subtask in pending:
+            if subtask.Sub_Task == requested.get("Subtask") and task.Task == requested.get("Task"):
+                return task, subtask
+    return pending[0] if pending else (None, None)
+
+
+class MockLLM:
+    def __init__(self, latency=0.0, tokens_per_second=None, jitter=0.0, tasks=3, subtasks=2, narration_tokens=120, seed=None):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.jitter = jitter
+        self.tasks = tasks
+        self.subtasks = subtasks
+        self.narration_tokens = narration_tokens
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.seen_prefixes = set()
+        self.calls = 0
+
+    # ------------------- Latency and token model -------------------
+
+    def first_token_delay(self):
+        with self.lock:
+            self.calls += 1
+            return self.latency * (1 + self.random.uniform(-self.jitter, self.jitter))
+
+    def token_delay(self, completion_tokens):
+        if not self.tokens_per_second:
+            return 0.0
+        return completion_tokens / self.tokens_per_second
+
+    def usage(self, messages, completion_tokens):
+        prompt_tokens = sum(_tokens(message["content"]) for message in messages)
+        # Like the provider's prompt cache: a repeated system prompt of 1024+ tokens is served in 128-token blocks
+        cached_tokens = 0
+        if messages[0]["role"] == "system":
+            system_tokens = _tokens(messages[0]["content"])
+            prefix = hashlib.sha256(messages[0]["content"].encode("utf-8")).hexdigest()
+            with self.lock:
+                if prefix in self.seen_prefixes and system_tokens >= 1024:
+                    cached_tokens = system_tokens // 128 * 128
+                self.seen_prefixes.add(prefix)
+        return SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, total_tokens=prompt_tokens + completion_tokens,
+                               prompt_tokens_details=SimpleNamespace(cached_tokens=cached_tokens))
+
+    # ------------------- Structured responses -------------------
+
+    def respond(self, messages, response_format):
+        fields = response_format.model_fields
+        sections = _sections(messages)
+        if "Subtask_Status" in fields:
+            data = self._subtask_result(sections)
+        elif "Current_Task" not in fields and "Agent_Output" not in fields:
+            data = self._new_plan()
+        else:
+            data = self._conductor_step(sections, select="Current_Task" in fields, execute="Agent_Output" in fields)
+        if "Plan_Updates" in fields:
+            data["Plan_Updates"] = self._delta(data["Previous_Plan"], data["Plan"])
+        return response_format.model_validate({key: value for key, value in data.items() if key in fields or key in ("st_memory", "lt_memory")})
+
+    def _new_plan(self):
+        tasks = []
+        for task_number in range(1, self.tasks + 1):
+            sub_tasks = []
+            for subtask_number in range(1, self.subtasks + 1):
+                agent, function = MOCK_AGENTS[(task_number + subtask_number) % len(MOCK_AGENTS)]
+                depends_on = [f"Subtask {task_number - 1}.{number}" for number in range(1, self.subtasks + 1)] if task_number > 1 else []
+                sub_tasks.append({"Sub_Task": f"Subtask {task_number}.{subtask_number}", "Agent": agent, "Agent_Function": function, "Depends_On": depends_on})
+            tasks.append({"Task": f"Task {task_number}", "Sub_Tasks": sub_tasks})
+        return {
+            "Plan": {"Tasks": tasks, "Overall_execution_of_the_plan": "In Progress"},
+            "st_memory": {"Thought": "Break the request into tasks", "Action": "Created the plan", "Observation": f"{self.tasks} tasks planned"},
+            "lt_memory": {"Thought": "Plans of this size finish in a few steps", "Action": "Recorded the plan", "Observation": "No earlier plans"},
+        }
+
+    def _conductor_step(self, sections, select, execute):
+        plan = Plan.model_validate_json(sections["Plan"])
+        previous_plan = plan.model_copy(deep=True)
+        requested = None
+        for name in ("Current Task", "Next Task"):
+            if name in sections:
+                requested = _parse_section(sections[name]) or {}
+                # The first conductor call wraps the task in a "Task" object
+                if isinstance(requested.get("Task"), dict):
+                    requested = requested["Task"]
+                break
+        task, subtask = _select(plan, requested)
+        data = {"Previous_Plan": previous_plan}
+        if task is None:
+            # Nothing left to run; report the plan as done
+            plan.Overall_execution_of_the_plan = "Completed"
+            task, subtask = plan.Tasks[-1], plan.Tasks[-1].Sub_Tasks[-1]
+        current = {"Task": task.Task, "Subtask": subtask.Sub_Task}
+        agent_input = {"agent_input": f"Run {subtask.Agent_Function} for {subtask.Sub_Task}", "Agent": subtask.Agent, "Agent_Function": subtask.Agent_Function}
+        data["Current_Task"] = current
+        data["Agent_Input"] = agent_input
+
+        if select and not execute:
+            if not _done(subtask.Subtask_Status):
+                subtask.Subtask_Status = "In Progress"
+                task.Task_Status = "In Progress"
+        if execute:
+            output = f"{subtask.Agent} ran {subtask.Agent_Function} for {subtask.Sub_Task}: " + " ".join(self.random.choice(FILLER_WORDS) for _ in range(20))
+            subtask.Sub_Task_Output = output
+            subtask.Sub_Task_Output_Observation = "The subtask produced the expected data"
+            subtask.Subtask_Status = "Successful"
+            if all(_done(item.Subtask_Status) for item in task.Sub_Tasks):
+                task.Task_Status = "Successful"
+                task.Task_Output = f"All subtasks of {task.Task} completed"
+                task.Task_Output_Observation = "The task completed successfully"
+            else:
+                task.Task_Status = "In Progress"
+            data["Agent_Output"] = {"agent_output": output, "Agent": subtask.Agent, "Agent_Function": subtask.Agent_Function}
+
+            next_task, next_subtask = _select(plan, None)
+            if next_task is None:
+                plan.Overall_execution_of_the_plan = "Completed"
+                next_task, next_subtask = task, subtask
+            data["Next_Task"] = {"Task": next_task.Task, "Subtask": next_subtask.Sub_Task}
+            data["Next_Agent_Input"] = {"agent_input": f"Run {next_subtask.Agent_Function} for {next_subtask.Sub_Task}", "Agent": next_subtask.Agent, "Agent_Function": next_subtask.Agent_Function}
+
+        data["Plan"] = plan.model_dump()
+        data["st_memory"] = {"Thought": f"Work on {subtask.Sub_Task}", "Action": f"{subtask.Agent}.{subtask.Agent_Function}", "Observation": subtask.Subtask_Status or ""}
+        lt_memory = _parse_section(sections.get("Long-Term Memory", "{}")) or {}
+        # With bounded memory the section holds a log; its newest entry is the current memory
+        if lt_memory.get("Recent"):
+            lt_memory = lt_memory["Recent"][-1]
+        data["lt_memory"] = lt_memory or {"Thought": "", "Action": "", "Observation": ""}
+        return data
+
+    def _subtask_result(self, sections):
+        subtask = _parse_section(sections["Subtask"])
+        output = f"{subtask['Agent']} ran {subtask['Agent_Function']} for {subtask['Sub_Task']}: " + " ".join(self.random.choice(FILLER_WORDS) for _ in range(20))
+        return {
+            "Agent_Input": {"agent_input": f"Run {subtask['Agent_Function']} for {subtask['Sub_Task']}", "Agent": subtask["Agent"], "Agent_Function": subtask["Agent_Function"]},
+            "Agent_Output": {"agent_output": output, "Agent": subtask["Agent"], "Agent_Function": subtask["Agent_Function"]},
+            "Sub_Task_Output_Observation": "The subtask produced the expected data",
+            "Subtask_Status": "Successful",
+        }
+
+    def _delta(self, previous_plan, plan):
+        plan = Plan.model_validate(plan)
+        delta = {"Task_Updates": [], "Sub_Task_Updates": [], "Overall_execution_of_the_plan": None}
+        for old_task, task in zip(previous_plan.Tasks, plan.Tasks):
+            fields = ["Task_Output", "Task_Output_Observation", "Task_Status"]
+            changed = {field: getattr(task, field) for field in fields if getattr(task, field) != getattr(old_task, field)}
+            if changed:
+                delta["Task_Updates"].append({"Task": task.Task, **changed})
+            for old_subtask, subtask in zip(old_task.Sub_Tasks, task.Sub_Tasks):
+                fields = ["Sub_Task_Output", "Sub_Task_Output_Observation", "Subtask_Status"]
+                changed = {field: getattr(subtask, field) for field in fields if getattr(subtask, field) != getattr(old_subtask, field)}
+                if changed:
+                    delta["Sub_Task_Updates"].append({"Task": task.Task, "Sub_Task": subtask.Sub_Task, **changed})
+        if plan.Overall_execution_of_the_plan != previous_plan.Overall_execution_of_the_plan:
+            delta["Overall_execution_of_the_plan"] = plan.Overall_execution_of_the_plan
+        return delta
+
+    # ------------------- Narration -------------------
+
+    def narration(self):
+        words = [self.random.choice(FILLER_WORDS) for _ in range(self.narration_tokens - 1)]
+        return ["**MockAgent**"] + [" " + word for word in words]
+
+
+def _parse_section(body):
+    try:
+        value = json.loads(body)
+    except ValueError:
+        return None
+    return value if isinstance(value, dict) else None
+
+
+def _parsed_completion(parsed, usage):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(parsed=parsed, content=parsed.model_dump_json(by_alias=True)))], usage=usage)
+
+
+def _completion(content, usage):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+
+def _chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))], usage=None)
+
+
+class _MockParse:
+    def __init__(self, owner):
+        self.owner = owner
+
+    def parse(self, model, messages, response_format, **kwargs):
+        return self.owner._parse(messages, response_format)
+
+
+class _MockCreate:
+    def __init__(self, owner):
+        self.owner = owner
+
+    def create(self, model, messages, stream=False, **kwargs):
+        return self.owner._create(messages, stream)
+
+
+class MockClient:
+    def __init__(self, llm=None, **options):
+        self.llm = llm or MockLLM(**options)
+        self.chat = SimpleNamespace(completions=_MockCreate(self))
+        self.beta = SimpleNamespace(chat=SimpleNamespace(completions=_MockParse(self)))
+
+    def _parse(self, messages, response_format):
+        parsed = self.llm.respond(messages, response_format)
+        completion_tokens = _tokens(parsed.model_dump_json())
+        time.sleep(self.llm.first_token_delay() + self.llm.token_delay(completion_tokens))
+        return _parsed_completion(parsed, self.llm.usage(messages, completion_tokens))
+
+    def _create(self, messages, stream):
+        tokens = self.llm.narration()
+        if stream:
+            return self._stream(tokens)
+        time.sleep(self.llm.first_token_delay() + self.llm.token_delay(len(tokens)))
+        return _completion("".join(tokens), self.llm.usage(messages, len(tokens)))
+
+    def _stream(self, tokens):
+        time.sleep(self.llm.first_token_delay())
+        for token in tokens:
+            time.sleep(self.llm.token_delay(1))
+            yield _chunk(token)
+
+
+class AsyncMockClient(MockClient):
+    async def _parse(self, messages, response_format):
+        parsed = self.llm.respond(messages, response_format)
+        completion_tokens = _tokens(parsed.model_dump_json())
+        await asyncio.sleep(self.llm.first_token_delay() + self.llm.token_delay(completion_tokens))
+        return _parsed_completion(parsed, self.llm.usage(messages, completion_tokens))
+
+    async def _create(self, messages, stream):
+        tokens = self.llm.narration()
+        if stream:
+            return self._stream(tokens)
+        await asyncio.sleep(self.llm.first_token_delay() + self.llm.token_delay(len(tokens)))
+        return _completion("".join(tokens), self.llm.usage(messages, len(tokens)))
+
+    async def _stream(self, tokens):
+        await asyncio.sleep(self.llm.first_token_delay())
+        for token in tokens:
+            await asyncio.sleep(self.llm.token_delay(1))
+            yield _chunk(token)
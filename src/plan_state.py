@@ -0,0 +1,161 @@
+# In-process plan state helpers: the conductor can return only what changed in a step (a PlanDelta)
+# and the orchestrator applies it to the Plan it already holds. In parallel and local scheduler modes the orchestrator
+# also picks the subtasks that are ready to run and merges their results into the plan itself.
+
+COMPLETION_STATUSES = ["complete", "completed", "successful"]
+# A subtask that was executed and failed is done as well: the prompts have the conductor mark the plan Completed once
+# every subtask has been executed, successfully or not
+FAILED_STATUSES = ["unsuccessful", "not successful", "failed"]
+
+
+def _key(name):
+    return (name or "").strip().casefold()
+
+
+# Task.Sub_Tasks is optional and the model may send it as null; the helpers below read such a task as having no subtasks
+
+
+def _find_task(plan, task_name):
+    return next((task for task in plan.Tasks if _key(task.Task) == _key(task_name)), None)
+
+
+def _find_subtask(plan, task_name, subtask_name):
+    task = _find_task(plan, task_name)
+    candidates = (task.Sub_Tasks or []) if task is not None else [subtask for task in plan.Tasks for subtask in task.Sub_Tasks or []]
+    # The model sometimes gets the parent task name slightly wrong; fall back to a plan-wide subtask match
+    subtask = next((subtask for subtask in candidates if _key(subtask.Sub_Task) == _key(subtask_name)), None)
+    if subtask is None and task is not None:
+        subtask = next((subtask for task in plan.Tasks for subtask in task.Sub_Tasks or [] if _key(subtask.Sub_Task) == _key(subtask_name)), None)
+    return subtask
+
+
+def _apply_fields(target, update, fields):
+    for field in fields:
+        value = getattr(update, field)
+        if value is not None:
+            setattr(target, field, value)
+
+
+def apply_plan_delta(plan, delta):
+    # Returns a new Plan; the plan passed in is left untouched
+    plan = plan.model_copy(deep=True)
+
+    for update in delta.Sub_Task_Updates:
+        subtask = _find_subtask(plan, update.Task, update.Sub_Task)
+        if subtask is None:
+            print(f"Ignoring update for unknown subtask: {update.Task} / {update.Sub_Task}")
+            continue
+        _apply_fields(subtask, update, ["Sub_Task_Output", "Sub_Task_Output_Observation", "Subtask_Status"])
+
+    for update in delta.Task_Updates:
+        task = _find_task(plan, update.Task)
+        if task is None:
+            print(f"Ignoring update for unknown task: {update.Task}")
+            continue
+        _apply_fields(task, update, ["Task_Output", "Task_Output_Observation", "Task_Status"])
+
+    if delta.Overall_execution_of_the_plan is not None:
+        plan.Overall_execution_of_the_plan = delta.Overall_execution_of_the_plan
+
+    return plan
+
+
+def _status(status):
+    # "In-Progress", "in_progress" and " In Progress " are the same status
+    return " ".join((status or "").replace("-", " ").replace("_", " ").split()).casefold()
+
+
+def _succeeded(status):
+    return _status(status) in COMPLETION_STATUSES
+
+
+def _executed(status):
+    return _status(status) in COMPLETION_STATUSES or _status(status) in FAILED_STATUSES
+
+
+def plan_completed(plan):
+    # Decided from the statuses in the plan rather than only from the model's overall verdict, which it often forgets
+    # to write: the plan is done once every subtask (or its whole task) has been executed
+    if _succeeded(plan.Overall_execution_of_the_plan):
+        return True
+    subtasks = [(task, subtask) for task in plan.Tasks for subtask in task.Sub_Tasks or []]
+    return bool(subtasks) and all(_executed(subtask.Subtask_Status) or _executed(task.Task_Status) for task, subtask in subtasks)
+
+
+def mark_completed(plan):
+    # Returns the plan with its overall status set to Completed once its statuses say it is done
+    if _succeeded(plan.Overall_execution_of_the_plan) or not plan_completed(plan):
+        return plan
+    return plan.model_copy(update={"Overall_execution_of_the_plan": "Completed"})
+
+
+def _dependencies(plan):
+    # (task, subtask, names of the subtasks it depends on) in plan order. No declared dependencies keeps the sequential
+    # order: the subtask waits for the one before it
+    previous = None
+    for task in plan.Tasks:
+        for subtask in task.Sub_Tasks or []:
+            yield task, subtask, subtask.Depends_On if subtask.Depends_On is not None else [previous.Sub_Task] if previous is not None else []
+            previous = subtask
+
+
+def _statuses(plan):
+    return {_key(subtask.Sub_Task): subtask.Subtask_Status for task in plan.Tasks for subtask in task.Sub_Tasks or []}
+
+
+def ready_subtasks(plan):
+    # (task, subtask) pairs that have not run yet and whose dependencies all have, in plan order. A subtask that ran and
+    # failed is not run again and does not hold up the ones that depend on it, the same way the conductor moves on
+    statuses = _statuses(plan)
+    # A dependency name that matches no subtask is ignored rather than blocking the plan
+    return [(task, subtask) for task, subtask, depends_on in _dependencies(plan)
+            if not _executed(subtask.Subtask_Status) and not _executed(task.Task_Status) and all(_executed(statuses.get(_key(name), "successful")) for name in depends_on)]
+
+
+def next_subtask(plan):
+    # Local scheduler: the first ready (task, subtask), or None when no subtask can run
+    return next(iter(ready_subtasks(plan)), None)
+
+
+def subtask_failed(result):
+    return _status(result.Subtask_Status) in FAILED_STATUSES
+
+
+def dependency_outputs(plan, subtask):
+    # Outputs of the subtasks this one depends on, for its agent prompt
+    names = next(([_key(name) for name in depends_on] for _, item, depends_on in _dependencies(plan) if _key(item.Sub_Task) == _key(subtask.Sub_Task)), [])
+    return {item.Sub_Task: item.Sub_Task_Output for task in plan.Tasks for item in task.Sub_Tasks or [] if _key(item.Sub_Task) in names}
+
+
+def merge_subtask_results(plan, results):
+    # Applies the (task name, subtask name, SubTaskResult) of one parallel step and rolls the statuses up to the tasks
+    # and the plan. Returns a new Plan.
+    plan = plan.model_copy(deep=True)
+
+    for task_name, subtask_name, result in results:
+        subtask = _find_subtask(plan, task_name, subtask_name)
+        if subtask is None:
+            print(f"Ignoring result for unknown subtask: {task_name} / {subtask_name}")
+            continue
+        subtask.Sub_Task_Output = result.Agent_Output.agent_output
+        subtask.Sub_Task_Output_Observation = result.Sub_Task_Output_Observation
+        subtask.Subtask_Status = result.Subtask_Status
+
+    for task in plan.Tasks:
+        if all(_succeeded(subtask.Subtask_Status) for subtask in task.Sub_Tasks or []):
+            task.Task_Status = "Successful"
+            if task.Task_Output is None:
+                task.Task_Output = "\n".join(subtask.Sub_Task_Output for subtask in task.Sub_Tasks or [] if subtask.Sub_Task_Output)
+                task.Task_Output_Observation = "All subtasks completed"
+        elif any(subtask.Subtask_Status for subtask in task.Sub_Tasks or []):
+            task.Task_Status = "In Progress"
+
+    plan.Overall_execution_of_the_plan = "In Progress"
+    return mark_completed(plan)
+
+
+def prompt_json(model, default="{}"):
+    # State is serialized only at the prompt boundary: compact separators and no null fields
+    if model is None:
+        return default
+    return model.model_dump_json(exclude_none=True)
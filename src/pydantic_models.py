@@ -9,6 +9,8 @@ class SubTask(BaseModel):
     Sub_Task_Output: Optional[str] = None
     Sub_Task_Output_Observation: Optional[str] = None
     Subtask_Status: Optional[str] = None
+    # Parallel mode: names of the subtasks that must succeed first; [] for none, null for the previous subtask in the plan
+    Depends_On: Optional[List[str]] = None
 
 class Task(BaseModel):
     Task: str
@@ -72,4 +74,107 @@ class OverallResponse2(BaseModel):
     Short_Term_Memory: ShortTermMemory = Field(alias="st_memory")
     Long_Term_Memory: LongTermMemory = Field(alias="lt_memory")
     Next_Task: NextTask
-    Next_Agent_Input: NextAgentInput
\ No newline at end of file
+    Next_Agent_Input: NextAgentInput
+
+class OverallResponse3(BaseModel):
+    Current_Task: CurrentTask
+    Agent_Input: AgentInput
+    Agent_Output: AgentOutput
+    Plan: Plan
+    Short_Term_Memory: ShortTermMemory = Field(alias="st_memory")
+    Long_Term_Memory: LongTermMemory = Field(alias="lt_memory")
+    Next_Task: NextTask
+    Next_Agent_Input: NextAgentInput
+
+# ------------------- Parallel mode: result of one subtask run on its own -------------------
+
+class SubTaskResult(BaseModel):
+    Agent_Input: AgentInput
+    Agent_Output: AgentOutput
+    Sub_Task_Output_Observation: str
+    Subtask_Status: str
+
+# ------------------- Local scheduler: the agent's work on an Agent Input built from the plan -------------------
+
+class AgentResult(BaseModel):
+    Agent_Output: AgentOutput
+    Sub_Task_Output_Observation: str
+    Subtask_Status: str
+
+# ------------------- Plan deltas: only the changed parts of the plan -------------------
+
+class TaskUpdate(BaseModel):
+    Task: str
+    Task_Output: Optional[str] = None
+    Task_Output_Observation: Optional[str] = None
+    Task_Status: Optional[str] = None
+
+class SubTaskUpdate(BaseModel):
+    Task: str
+    Sub_Task: str
+    Sub_Task_Output: Optional[str] = None
+    Sub_Task_Output_Observation: Optional[str] = None
+    Subtask_Status: Optional[str] = None
+
+class PlanDelta(BaseModel):
+    Task_Updates: List[TaskUpdate] = Field(default_factory=list)
+    Sub_Task_Updates: List[SubTaskUpdate] = Field(default_factory=list)
+    Overall_execution_of_the_plan: Optional[str] = None
+
+class OverallResponse1Delta(BaseModel):
+    Current_Task: CurrentTask
+    Agent_Input: AgentInput
+    Plan_Updates: PlanDelta
+    Short_Term_Memory: ShortTermMemory = Field(alias="st_memory")
+    Long_Term_Memory: LongTermMemory = Field(alias="lt_memory")
+
+class OverallResponse2Delta(BaseModel):
+    Agent_Output: AgentOutput
+    Plan_Updates: PlanDelta
+    Short_Term_Memory: ShortTermMemory = Field(alias="st_memory")
+    Long_Term_Memory: LongTermMemory = Field(alias="lt_memory")
+    Next_Task: NextTask
+    Next_Agent_Input: NextAgentInput
+
+class OverallResponse3Delta(BaseModel):
+    Current_Task: CurrentTask
+    Agent_Input: AgentInput
+    Agent_Output: AgentOutput
+    Plan_Updates: PlanDelta
+    Short_Term_Memory: ShortTermMemory = Field(alias="st_memory")
+    Long_Term_Memory: LongTermMemory = Field(alias="lt_memory")
+    Next_Task: NextTask
+    Next_Agent_Input: NextAgentInput
+
+# ------------------- Bounded memory: what the prompts see of each memory tier -------------------
+
+class MemoryEntry(BaseModel):
+    Thought: Optional[str] = None
+    Action: Optional[str] = None
+    Observation: Optional[str] = None
+
+class MemoryLog(BaseModel):
+    Summary: Optional[str] = None
+    Recent: List[MemoryEntry] = Field(default_factory=list)
+
+# ------------------- Run state carried between steps in-process -------------------
+
+class RunState(BaseModel):
+    Plan: Plan
+    # The request the plan was made for
+    Industry: Optional[str] = None
+    Use_Case: Optional[str] = None
+    Query: Optional[str] = None
+    Short_Term_Memory: ShortTermMemory = Field(default_factory=ShortTermMemory)
+    Long_Term_Memory: LongTermMemory = Field(default_factory=LongTermMemory)
+    Current_Task: Optional[CurrentTask] = None
+    Agent_Input: Optional[AgentInput] = None
+    Agent_Output: Optional[AgentOutput] = None
+    Next_Task: Optional[NextTask] = None
+    Next_Agent_Input: Optional[NextAgentInput] = None
+    Steps: int = 0
+    # Local scheduler mode: plan revisions made after failed subtasks
+    Replans: int = 0
+    # Set when a MemoryManager bounds the memories; the prompts then carry these instead of the two memories
+    Short_Term_Log: Optional[MemoryLog] = None
+    Long_Term_Log: Optional[MemoryLog] = None
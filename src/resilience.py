@@ -0,0 +1,86 @@
+import email.utils, random, threading, time
+from openai import APIConnectionError, APIStatusError, APITimeoutError
+
+# Retry policy and rate limiting for the orchestrator's LLM calls. MAS_orchestrator retries transient failures
+# (429, 408/409, 5xx, timeouts, connection errors) with exponential backoff and full jitter, waits as long as a
+# Retry-After header asks, and takes a token from the deployment's shared bucket before every attempt.
+# The clients are built with max_retries=0 so the SDK does not retry underneath.
+
+TRANSIENT_STATUS_CODES = [408, 409, 429, 500, 502, 503, 504]
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts=4, base_delay=1.0, max_delay=30.0, timeout=120.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # Per-attempt request timeout in seconds, passed to the client call
+        self.timeout = timeout
+        self.random = random.Random()
+
+    def is_transient(self, e):
+        if isinstance(e, (APITimeoutError, APIConnectionError)):
+            return True
+        return isinstance(e, APIStatusError) and e.status_code in TRANSIENT_STATUS_CODES
+
+    def delay(self, attempt, e=None):
+        retry_after = retry_after_seconds(e)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        # Full jitter: spreads the retries of concurrent plan runs instead of having them hit the endpoint together
+        return self.random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+def retry_after_seconds(e):
+    response = getattr(e, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    # Retry-After may also be an HTTP date
+    retry_at = email.utils.parsedate_to_datetime(value)
+    return max(0.0, retry_at.timestamp() - time.time()) if retry_at is not None else None
+
+
+class TokenBucket:
+    # Requests per minute for one deployment, shared by every orchestrator that calls it
+    def __init__(self, requests_per_minute, burst=None):
+        self.rate = requests_per_minute / 60
+        self.capacity = burst or max(1, requests_per_minute // 10)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        # Takes the tokens now and returns how long the caller has to wait before using them
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= tokens
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def rate_limiter_for(deployment, requests_per_minute):
+    if not requests_per_minute:
+        return None
+    with _rate_limiters_lock:
+        key = (deployment, requests_per_minute)
+        if key not in _rate_limiters:
+            _rate_limiters[key] = TokenBucket(requests_per_minute)
+        return _rate_limiters[key]
@@ -0,0 +1,142 @@
+import argparse, asyncio, contextlib, hashlib, json, os, sys, time
+from dotenv import load_dotenv
+
+from src.mas import DEFAULT_MAX_STEPS, AsyncMAS_orchestrator
+from src.sinks import JsonlSink, NullSink, OpenTelemetrySink, TeeSink
+from src.clients import async_azure_client
+from src.cache import CACHE_MODES, DEFAULT_CACHE_PATH, AsyncCachedClient, ResponseCache
+from src.mock_llm import AsyncMockClient
+from src.resilience import rate_limiter_for
+from src.scheduler import scheduler_for
+from src.memory import MemoryManager
+from src.memory_store import LongTermStore
+from src.checkpoints import COMPLETED, CheckpointSink, CheckpointStore, resumable
+import src.pydantic_models as pydantic_models
+
+# Headless runner: executes plan -> conductor loop -> final summary for each industry/use_case/query
+# record of a JSONL file, with a bounded number of plan runs in flight, and streams results out as JSONL.
+#
+#   python -m src.runner scenarios.jsonl --concurrency 8 --output results.jsonl
+
+
+def load_records(path):
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            record.setdefault("id", line_number)
+            records.append(record)
+    return records
+
+
+def checkpoint_id(record):
+    # The record id alone could match a run of another input file; the request is part of the id
+    request = json.dumps([record.get("industry"), record.get("use_case"), record.get("query")])
+    return f"{record['id']}-{hashlib.sha256(request.encode('utf-8')).hexdigest()[:12]}"
+
+
+async def run_batch(records, client, model, concurrency=4, out=sys.stdout, fused_step=False, pipelined=False, plan_delta=False, parallel_subtasks=False, local_scheduler=False, max_steps=DEFAULT_MAX_STEPS, max_tokens=None, sink=None, requests_per_minute=None, tokens_per_minute=None, memory_tokens=None, memory_store=None, checkpoints=None):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_record(record):
+        async with semaphore:
+            result = await run_resumable(record) if checkpoints is not None else await run_one(record, sink or NullSink())
+        line = {"id": record["id"], "industry": record.get("industry"), "use_case": record.get("use_case"), "query": record.get("query")}
+        line.update(result)
+        # One line per finished run, written as soon as it completes
+        out.write(json.dumps(line) + "\n")
+        out.flush()
+        return line
+
+    async def run_resumable(record):
+        run_id = checkpoint_id(record)
+        checkpoint = checkpoints.get(run_id)
+        if checkpoint is None:
+            return await run_one(record, TeeSink(sink or NullSink(), CheckpointSink(checkpoints, run_id)))
+        state = checkpoints.load(run_id)
+        if checkpoint["status"] == COMPLETED:
+            # Finished before the interruption: reported from the checkpoint without any LLM call
+            return {"status": "completed", "steps": state.Steps, "plan": state.Plan.model_dump(mode="json"), "final_output": checkpoint["final_output"], "resumed_from_step": state.Steps, "elapsed": 0.0}
+        if not resumable(checkpoint, max_steps):
+            # Stopped by --max-steps or --max-tokens: resuming would stop at the same limit again
+            return {"status": checkpoint["status"], "steps": state.Steps, "plan": state.Plan.model_dump(mode="json"), "final_output": None, "resumed_from_step": state.Steps, "elapsed": 0.0}
+        print(f"Resuming run {run_id} after step {state.Steps}", file=sys.stderr)
+        result = await run_one(record, TeeSink(sink or NullSink(), CheckpointSink(checkpoints, run_id)), state)
+        result["resumed_from_step"] = state.Steps
+        return result
+
+    async def run_one(record, run_sink, state=None):
+        mas_orchestrator = AsyncMAS_orchestrator(client, model, pydantic_models, fused_step=fused_step, pipelined=pipelined, plan_delta=plan_delta, parallel_subtasks=parallel_subtasks, local_scheduler=local_scheduler, memory_manager=MemoryManager(memory_tokens, memory_tokens) if memory_tokens else None, memory_store=memory_store, max_tokens=max_tokens, sink=run_sink, rate_limiter=rate_limiter_for(model, requests_per_minute), scheduler=scheduler_for(model, tokens_per_minute))
+        started = time.perf_counter()
+        try:
+            result = await mas_orchestrator.run(record.get("industry", ""), record.get("use_case", ""), record.get("query", ""), state, max_steps=max_steps)
+        except Exception as e:
+            print(f"An unexpected error occurred: {e}", file=sys.stderr)
+            result = {"status": "failed", "steps": 0, "plan": None, "final_output": None, "tokens": mas_orchestrator.tokens_used, "error": str(e)}
+        result["elapsed"] = round(time.perf_counter() - started, 3)
+        return result
+
+    return await asyncio.gather(*[run_record(record) for record in records])
+
+
+def build_client():
+    return async_azure_client(os.getenv('AZURE_OPENAI_ENDPOINT'), os.getenv('AZURE_OPENAI_MODEL'), os.getenv('AZURE_OPENAI_KEY'))
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Run Multi-Agent Playground scenarios headless from a JSONL file.")
+    parser.add_argument("input", help="JSONL file with industry, use_case and query fields per line")
+    parser.add_argument("--output", help="JSONL file for the results (default: stdout)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum number of plan runs in flight")
+    parser.add_argument("--model", default=os.getenv('AZURE_OPENAI_MODEL'), help="Model deployment name")
+    parser.add_argument("--fused-step", action="store_true", help="Use a single conductor call per step")
+    parser.add_argument("--pipelined", action="store_true", help="Generate narration messages while the next conductor call is running")
+    parser.add_argument("--plan-delta", action="store_true", help="Have the conductor return only the changed parts of the plan")
+    parser.add_argument("--parallel", action="store_true", help="Run every subtask whose dependencies are met at the same time")
+    parser.add_argument("--local-scheduler", action="store_true", help="Pick the next subtask from the plan locally; one agent call per step")
+    parser.add_argument("--memory-tokens", type=int, default=int(os.getenv('MAS_MEMORY_TOKENS', '0')), help="Token budget of each memory tier in the prompts; older entries are summarized past it (default: unbounded)")
+    parser.add_argument("--memory-store", default=os.getenv('MAS_MEMORY_PATH'), help="sqlite file of the persistent long-term memory; completed plans are saved to it and planners retrieve from it")
+    parser.add_argument("--checkpoints", default=os.getenv('MAS_CHECKPOINT_PATH'), help="sqlite file of run checkpoints; a rerun with the same file resumes interrupted runs and skips finished ones")
+    parser.add_argument("--events", help="JSONL file that receives every orchestrator event (plan_created, step_started, ...)")
+    parser.add_argument("--rpm", type=int, default=int(os.getenv('MAS_REQUESTS_PER_MINUTE', '0')), help="Requests per minute allowed on the deployment, shared by all plan runs (default: unlimited)")
+    parser.add_argument("--tpm", type=int, default=int(os.getenv('MAS_TOKENS_PER_MINUTE', '0')), help="Tokens per minute allowed on the deployment; calls queue so all plan runs together stay under it (default: unlimited)")
+    parser.add_argument("--otel", action="store_true", help="Export every LLM call as an OpenTelemetry span (needs opentelemetry-sdk)")
+    parser.add_argument("--max-steps", type=int, default=int(os.getenv('MAS_MAX_STEPS', DEFAULT_MAX_STEPS)), help="Stop a plan run after this many conductor steps")
+    parser.add_argument("--max-tokens", type=int, default=int(os.getenv('MAS_MAX_TOKENS', '0')), help="Stop a plan run once its calls have used this many tokens (default: unlimited)")
+    parser.add_argument("--mock", action="store_true", help="Use the offline mock LLM instead of Azure OpenAI")
+    parser.add_argument("--mock-latency", type=float, default=0.0, help="Mock time to first token, in seconds")
+    parser.add_argument("--mock-tokens-per-second", type=float, default=None, help="Mock generation speed (default: instant)")
+    parser.add_argument("--cache-mode", choices=CACHE_MODES, default="off", help="record: reuse stored responses and store new ones, replay: stored responses only")
+    parser.add_argument("--cache", default=os.getenv('MAS_CACHE_PATH', DEFAULT_CACHE_PATH), help="sqlite file of the response cache")
+    args = parser.parse_args(argv)
+
+    records = load_records(args.input)
+    client = AsyncMockClient(latency=args.mock_latency, tokens_per_second=args.mock_tokens_per_second) if args.mock else build_client()
+    if args.cache_mode != "off":
+        client = AsyncCachedClient(client, ResponseCache(args.cache), mode=args.cache_mode)
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    events_sink = JsonlSink(args.events) if args.events else NullSink()
+    memory_store = LongTermStore(args.memory_store) if args.memory_store else None
+    checkpoints = CheckpointStore(args.checkpoints) if args.checkpoints else None
+    sink = TeeSink(events_sink, OpenTelemetrySink()) if args.otel else events_sink
+    try:
+        # Keep the orchestrator's diagnostics off stdout so the results stay valid JSONL
+        with contextlib.redirect_stdout(sys.stderr):
+            asyncio.run(run_batch(records, client, args.model, concurrency=args.concurrency, out=out, fused_step=args.fused_step, pipelined=args.pipelined, plan_delta=args.plan_delta, parallel_subtasks=args.parallel, local_scheduler=args.local_scheduler, max_steps=args.max_steps, max_tokens=args.max_tokens, sink=sink, requests_per_minute=args.rpm, tokens_per_minute=args.tpm, memory_tokens=args.memory_tokens, memory_store=memory_store, checkpoints=checkpoints))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if args.events:
+            events_sink.close()
+        if memory_store is not None:
+            memory_store.close()
+        if checkpoints is not None:
+            checkpoints.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import asyncio, heapq, itertools, threading, time
+
+# Client-side tokens-per-minute scheduler shared by every plan run that calls a deployment. Before an LLM call the
+# orchestrator reserves the call's estimated cost (prompt tokens plus the expected completion) and waits until the
+# budget has room for it; once the call returns, the reservation is settled against the actual usage.
+# Waiting calls are served by priority, then in arrival order: steps of plans already in flight go before the
+# planner call of a new plan, so running plans finish instead of every plan stalling half way.
+
+IN_FLIGHT = 0
+NEW_PLAN = 1
+
+# Starting guesses for the completion size, replaced by a running average of what the calls actually return
+DEFAULT_COMPLETION_TOKENS = {"parse": 1500, "create": 500}
+POLL_INTERVAL = 0.05
+
+
+def estimate_prompt_tokens(messages):
+    # About four characters per token; close enough to budget with, the settle step corrects the difference
+    return sum(len(message["content"]) for message in messages) // 4
+
+
+class TokenScheduler:
+    def __init__(self, tokens_per_minute):
+        self.tokens_per_minute = tokens_per_minute
+        self.rate = tokens_per_minute / 60
+        self.available = tokens_per_minute
+        self.updated = time.monotonic()
+        self.completion_tokens = {}
+        self.waiting = []
+        self.sequence = itertools.count()
+        self.lock = threading.Lock()
+
+    def estimate(self, phase, kind, messages):
+        expected = self.completion_tokens.get((phase, kind), DEFAULT_COMPLETION_TOKENS[kind])
+        # A single call can never need more than the whole budget
+        return min(self.tokens_per_minute, estimate_prompt_tokens(messages) + int(expected))
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.tokens_per_minute, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _try_acquire(self, ticket, tokens):
+        # Returns 0 once the tokens are taken, otherwise how long to wait before trying again
+        with self.lock:
+            self._refill()
+            if self.waiting[0] != ticket:
+                return POLL_INTERVAL
+            if self.available < tokens:
+                return max(POLL_INTERVAL, (tokens - self.available) / self.rate)
+            heapq.heappop(self.waiting)
+            self.available -= tokens
+            return 0
+
+    def _enqueue(self, priority):
+        ticket = (priority, next(self.sequence))
+        with self.lock:
+            heapq.heappush(self.waiting, ticket)
+        return ticket
+
+    def _dequeue(self, ticket):
+        with self.lock:
+            if ticket in self.waiting:
+                self.waiting.remove(ticket)
+                heapq.heapify(self.waiting)
+
+    def acquire(self, tokens, priority=IN_FLIGHT):
+        ticket = self._enqueue(priority)
+        try:
+            while True:
+                wait = self._try_acquire(ticket, tokens)
+                if not wait:
+                    return tokens
+                time.sleep(wait)
+        finally:
+            self._dequeue(ticket)
+
+    async def acquire_async(self, tokens, priority=IN_FLIGHT):
+        ticket = self._enqueue(priority)
+        try:
+            while True:
+                wait = self._try_acquire(ticket, tokens)
+                if not wait:
+                    return tokens
+                await asyncio.sleep(wait)
+        finally:
+            # Also runs when the plan run is cancelled while waiting
+            self._dequeue(ticket)
+
+    def settle(self, phase, kind, reserved, prompt_tokens, completion_tokens):
+        # Gives back (or takes) the difference between the estimate and the tokens the call really used. A call without
+        # usage (a failed attempt) or served from the response cache (0 tokens) gives the whole reservation back and
+        # says nothing about the completion size
+        with self.lock:
+            self.available = min(self.tokens_per_minute, self.available + reserved - (prompt_tokens or 0) - (completion_tokens or 0))
+            if not completion_tokens:
+                return
+            average = self.completion_tokens.get((phase, kind), DEFAULT_COMPLETION_TOKENS[kind])
+            self.completion_tokens[(phase, kind)] = 0.8 * average + 0.2 * completion_tokens
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def scheduler_for(deployment, tokens_per_minute):
+    if not tokens_per_minute:
+        return None
+    with _schedulers_lock:
+        key = (deployment, tokens_per_minute)
+        if key not in _schedulers:
+            _schedulers[key] = TokenScheduler(tokens_per_minute)
+        return _schedulers[key]
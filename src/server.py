@@ -0,0 +1,303 @@
+import argparse, asyncio, json, os, sys, time, uuid
+from dotenv import load_dotenv
+
+from src.mas import DEFAULT_MAX_STEPS, AsyncMAS_orchestrator
+from src.sinks import EventSink, JsonlSink, NullSink, TeeSink, jsonable
+from src.runner import build_client
+from src.mock_llm import AsyncMockClient
+from src.resilience import rate_limiter_for
+from src.scheduler import scheduler_for
+from src.memory import MemoryManager
+from src.memory_store import LongTermStore
+import src.pydantic_models as pydantic_models
+
+# HTTP service for plan runs, a plain ASGI application on the async orchestrator. Submitted runs wait in a bounded
+# queue for one of a fixed number of workers; when the queue is full a submission is turned away with 503 and a
+# Retry-After header instead of piling up behind the model endpoint:
+#
+#   POST /runs                  {"industry", "use_case", "query"} -> 202 {"run_id", "status"}
+#   GET  /runs/{run_id}         status, steps, plan and final_output of the run
+#   GET  /runs/{run_id}/events  the run's events as Server-Sent Events, from the start (or after Last-Event-ID)
+#                               until the run has finished
+#   GET  /healthz               workers, queued and running runs
+#
+#   python -m src.server --port 8000 --workers 8 --queue-size 64     (serving needs uvicorn: pip install uvicorn)
+#
+# Runs live in the memory of the process that accepted them, so behind a load balancer the /runs/{run_id} requests of
+# a run have to reach the same instance (sticky routing on the run id).
+
+QUEUED = "queued"
+RUNNING = "running"
+FINISHED = ("completed", "failed", "max_steps", "max_tokens")
+
+# Finished runs can be fetched this long after they finished
+RUN_TTL_SECONDS = 3600
+# An SSE comment is sent after this long without events, so proxies keep the connection open
+KEEPALIVE_SECONDS = 15
+RETRY_AFTER_SECONDS = 5
+
+
+class Run:
+    def __init__(self, run_id, industry, use_case, query):
+        self.id = run_id
+        self.request = {"industry": industry, "use_case": use_case, "query": query}
+        self.status = QUEUED
+        self.result = None
+        self.finished = None
+        # (event, JSON data) in emission order; listeners wait on the added flag, replaced after every new event
+        self.events = []
+        self.added = asyncio.Event()
+
+    def add_event(self, event, data):
+        self.events.append((event, data))
+        self.added.set()
+        self.added = asyncio.Event()
+
+    def summary(self):
+        summary = {"run_id": self.id, "status": self.status, **self.request}
+        if self.result is not None:
+            summary.update(self.result)
+        return summary
+
+
+class RunSink(EventSink):
+    # Keeps the events of a run for its SSE listeners; the orchestrator emits from the event loop the run is on
+    def __init__(self, run):
+        self.run = run
+
+    def emit(self, event, **data):
+        # Per-call telemetry is for the telemetry sinks, not for the clients of the service
+        if event == "llm_call":
+            return
+        self.run.add_event(event, {key: jsonable(value) for key, value in data.items()})
+
+
+class PlanService:
+    def __init__(self, client, model, workers=4, queue_size=64, max_steps=DEFAULT_MAX_STEPS, max_tokens=None, sink=None, fused_step=False, pipelined=False, plan_delta=False, parallel_subtasks=False, local_scheduler=False, requests_per_minute=None, tokens_per_minute=None, memory_tokens=None, memory_store=None):
+        self.client = client
+        self.model = model
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_steps = max_steps
+        self.sink = sink or NullSink()
+        self.options = {"fused_step": fused_step, "pipelined": pipelined, "plan_delta": plan_delta, "parallel_subtasks": parallel_subtasks, "local_scheduler": local_scheduler, "memory_store": memory_store, "max_tokens": max_tokens}
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.memory_tokens = memory_tokens
+        self.runs = {}
+        self.queue = None
+        self.worker_tasks = []
+
+    # ------------------- Job queue -------------------
+
+    def start(self):
+        # Called from the running event loop (ASGI lifespan startup, or the first request)
+        if self.queue is None:
+            self.queue = asyncio.Queue(maxsize=self.queue_size)
+            self.worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self.worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self.worker_tasks, return_exceptions=True)
+        self.worker_tasks = []
+        self.queue = None
+
+    def submit(self, industry, use_case, query):
+        # Returns the queued Run, or None when the queue is full
+        self.start()
+        self._expire()
+        run = Run(uuid.uuid4().hex, industry, use_case, query)
+        try:
+            self.queue.put_nowait(run)
+        except asyncio.QueueFull:
+            return None
+        self.runs[run.id] = run
+        return run
+
+    async def _worker(self):
+        while True:
+            run = await self.queue.get()
+            try:
+                await self._execute(run)
+            finally:
+                self.queue.task_done()
+
+    async def _execute(self, run):
+        run.status = RUNNING
+        run.add_event("run_started", {"run_id": run.id})
+        mas_orchestrator = AsyncMAS_orchestrator(self.client, self.model, pydantic_models, sink=TeeSink(RunSink(run), self.sink), memory_manager=MemoryManager(self.memory_tokens, self.memory_tokens) if self.memory_tokens else None, rate_limiter=rate_limiter_for(self.model, self.requests_per_minute), scheduler=scheduler_for(self.model, self.tokens_per_minute), **self.options)
+        started = time.perf_counter()
+        try:
+            result = await mas_orchestrator.run(run.request["industry"], run.request["use_case"], run.request["query"], max_steps=self.max_steps)
+        except Exception as e:
+            print(f"An unexpected error occurred: {e}", file=sys.stderr)
+            result = {"status": "failed", "steps": 0, "plan": None, "final_output": None, "tokens": mas_orchestrator.tokens_used, "error": str(e)}
+        result["elapsed"] = round(time.perf_counter() - started, 3)
+        run.result = result
+        run.status = result["status"]
+        run.finished = time.time()
+        run.add_event("run_finished", run.summary())
+
+    def _expire(self):
+        now = time.time()
+        for run_id, run in list(self.runs.items()):
+            if run.finished is not None and now - run.finished > RUN_TTL_SECONDS:
+                del self.runs[run_id]
+
+    def health(self):
+        return {"workers": self.workers, "queued": self.queue.qsize() if self.queue is not None else 0, "running": sum(run.status == RUNNING for run in self.runs.values()), "queue_size": self.queue_size}
+
+    # ------------------- ASGI -------------------
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        self.start()
+        method, parts = scope["method"], [part for part in scope["path"].split("/") if part]
+
+        if parts == ["healthz"] and method == "GET":
+            await _send_json(send, 200, self.health())
+        elif parts == ["runs"] and method == "POST":
+            await self._submit(receive, send)
+        elif len(parts) in (2, 3) and parts[0] == "runs" and method == "GET":
+            run = self.runs.get(parts[1])
+            if run is None:
+                await _send_json(send, 404, {"error": f"Unknown run {parts[1]}"})
+            elif len(parts) == 2:
+                await _send_json(send, 200, run.summary())
+            elif parts[2] == "events":
+                await self._stream_events(run, scope, receive, send)
+            else:
+                await _send_json(send, 404, {"error": "Not found"})
+        else:
+            await _send_json(send, 404, {"error": "Not found"})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self.start()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.stop()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _submit(self, receive, send):
+        try:
+            request = json.loads(await _read_body(receive) or b"{}")
+            industry, use_case, query = (str(request.get(field) or "") for field in ("industry", "use_case", "query"))
+        except (ValueError, AttributeError):
+            await _send_json(send, 400, {"error": "The body must be a JSON object with industry, use_case and query"})
+            return
+        if not query:
+            await _send_json(send, 400, {"error": "query is required"})
+            return
+        run = self.submit(industry, use_case, query)
+        if run is None:
+            await _send_json(send, 503, {"error": "Too many plan runs are queued, retry later"}, [(b"retry-after", str(RETRY_AFTER_SECONDS).encode())])
+            return
+        await _send_json(send, 202, {"run_id": run.id, "status": run.status}, [(b"location", f"/runs/{run.id}".encode())])
+
+    async def _stream_events(self, run, scope, receive, send):
+        # Event ids are the positions of the events in the run, so a reconnecting client continues after Last-Event-ID
+        headers = dict(scope["headers"])
+        try:
+            seen = int(headers.get(b"last-event-id", b"-1")) + 1
+        except ValueError:
+            seen = 0
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache"), (b"x-accel-buffering", b"no")]})
+        disconnected = asyncio.create_task(_wait_for_disconnect(receive))
+        try:
+            while True:
+                added, events = run.added, run.events[seen:]
+                for index, (event, data) in enumerate(events, start=seen):
+                    await send({"type": "http.response.body", "body": f"id: {index}\nevent: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8"), "more_body": True})
+                seen += len(events)
+                # run_finished is the last event of a run
+                if run.status in FINISHED and seen == len(run.events):
+                    break
+                if not await _wait_for_event(added, disconnected):
+                    if disconnected.done():
+                        return
+                    await send({"type": "http.response.body", "body": b": keepalive\n\n", "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            disconnected.cancel()
+
+
+async def _wait_for_event(added, disconnected):
+    # True once the run has a new event; False after the keepalive interval or when the client went away
+    waiter = asyncio.create_task(added.wait())
+    done, _ = await asyncio.wait([waiter, disconnected], timeout=KEEPALIVE_SECONDS, return_when=asyncio.FIRST_COMPLETED)
+    waiter.cancel()
+    return waiter in done
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def _send_json(send, status, payload, headers=()):
+    body = json.dumps(payload).encode("utf-8")
+    await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), *headers]})
+    await send({"type": "http.response.body", "body": body})
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Serve Multi-Agent Playground plan runs over HTTP with Server-Sent Events.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=4, help="Plan runs executed at the same time")
+    parser.add_argument("--queue-size", type=int, default=64, help="Plan runs waiting for a worker; further submissions get 503")
+    parser.add_argument("--model", default=os.getenv('AZURE_OPENAI_MODEL'), help="Model deployment name")
+    parser.add_argument("--fused-step", action="store_true", help="Use a single conductor call per step")
+    parser.add_argument("--pipelined", action="store_true", help="Generate narration messages while the next conductor call is running")
+    parser.add_argument("--plan-delta", action="store_true", help="Have the conductor return only the changed parts of the plan")
+    parser.add_argument("--parallel", action="store_true", help="Run every subtask whose dependencies are met at the same time")
+    parser.add_argument("--local-scheduler", action="store_true", help="Pick the next subtask from the plan locally; one agent call per step")
+    parser.add_argument("--memory-tokens", type=int, default=int(os.getenv('MAS_MEMORY_TOKENS', '0')), help="Token budget of each memory tier in the prompts; older entries are summarized past it (default: unbounded)")
+    parser.add_argument("--memory-store", default=os.getenv('MAS_MEMORY_PATH'), help="sqlite file of the persistent long-term memory")
+    parser.add_argument("--events", help="JSONL file that receives every orchestrator event of every run")
+    parser.add_argument("--rpm", type=int, default=int(os.getenv('MAS_REQUESTS_PER_MINUTE', '0')), help="Requests per minute allowed on the deployment (default: unlimited)")
+    parser.add_argument("--tpm", type=int, default=int(os.getenv('MAS_TOKENS_PER_MINUTE', '0')), help="Tokens per minute allowed on the deployment (default: unlimited)")
+    parser.add_argument("--max-steps", type=int, default=int(os.getenv('MAS_MAX_STEPS', DEFAULT_MAX_STEPS)), help="Stop a plan run after this many conductor steps")
+    parser.add_argument("--max-tokens", type=int, default=int(os.getenv('MAS_MAX_TOKENS', '0')), help="Stop a plan run once its calls have used this many tokens (default: unlimited)")
+    parser.add_argument("--mock", action="store_true", help="Use the offline mock LLM instead of Azure OpenAI")
+    args = parser.parse_args(argv)
+
+    try:
+        import uvicorn
+    except ImportError as e:
+        raise ImportError("Serving the plan service requires uvicorn: pip install uvicorn") from e
+
+    client = AsyncMockClient() if args.mock else build_client()
+    events_sink = JsonlSink(args.events) if args.events else NullSink()
+    memory_store = LongTermStore(args.memory_store) if args.memory_store else None
+    service = PlanService(client, args.model, workers=args.workers, queue_size=args.queue_size, max_steps=args.max_steps, max_tokens=args.max_tokens, sink=events_sink, fused_step=args.fused_step, pipelined=args.pipelined, plan_delta=args.plan_delta, parallel_subtasks=args.parallel, local_scheduler=args.local_scheduler, requests_per_minute=args.rpm, tokens_per_minute=args.tpm, memory_tokens=args.memory_tokens, memory_store=memory_store)
+    try:
+        uvicorn.run(service, host=args.host, port=args.port)
+    finally:
+        if args.events:
+            events_sink.close()
+        if memory_store is not None:
+            memory_store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import contextlib, json, threading, time
+from pydantic import BaseModel
+
+from src.tools import StreamlitTools
+
+DIVIDER_HTML = """
+                <hr style="border: none; height: 2px; background-color: white; width: 50%; margin-left: auto; margin-right: auto;">
+                """
+
+# Events emitted by MAS_orchestrator:
+#   plan_created   state
+#   step_started   state (Current_Task, Agent_Input set)
+#   agent_output   state (Agent_Output, Next_Task, Next_Agent_Input set)
+#   message        phase, content, streamed, state
+#   plan_completed state, final_output
+#   run_stopped    state, status ("max_steps" or "max_tokens"): the run used up its budget before the plan was done
+#   error          phase, error
+#   llm_call       phase, kind, model, attempt, timings, token usage and outcome of one LLM call (see src/telemetry.py)
+# state is the RunState after the step; sinks serialize it only if they need to.
+
+
+def jsonable(value):
+    # An event field as a JSON value, for the sinks that serialize events (JSONL files, the HTTP service's SSE streams)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", by_alias=True, exclude_none=True)
+    return value
+
+
+class EventSink:
+    # No-op sink: servers and benchmarks drive the orchestrator with no rendering overhead
+    def emit(self, event, **data):
+        pass
+
+    def spinner(self, text):
+        return contextlib.nullcontext()
+
+    def message_stream(self):
+        # Returns a write(text, done) callable for incremental narration, or None when the sink only wants whole messages
+        return None
+
+
+NullSink = EventSink
+
+
+class JsonlSink(EventSink):
+    def __init__(self, path_or_file):
+        if isinstance(path_or_file, str):
+            self.file = open(path_or_file, "a", encoding="utf-8")
+            self.owns_file = True
+        else:
+            self.file = path_or_file
+            self.owns_file = False
+        self.lock = threading.Lock()
+
+    def emit(self, event, **data):
+        line = json.dumps({"event": event, "ts": time.time(), **{key: jsonable(value) for key, value in data.items()}})
+        with self.lock:
+            self.file.write(line + "\n")
+            self.file.flush()
+
+    def close(self):
+        if self.owns_file:
+            self.file.close()
+
+
+class TeeSink(EventSink):
+    # Sends every event to several sinks; the first one also provides spinners and message streams
+    def __init__(self, *sinks):
+        self.sinks = sinks
+
+    def emit(self, event, **data):
+        for sink in self.sinks:
+            sink.emit(event, **data)
+
+    def spinner(self, text):
+        return self.sinks[0].spinner(text)
+
+    def message_stream(self):
+        return self.sinks[0].message_stream()
+
+
+class OpenTelemetrySink(EventSink):
+    # Exports llm_call events as OpenTelemetry spans; needs the optional opentelemetry-api package
+    def __init__(self, tracer=None):
+        try:
+            from opentelemetry import trace
+        except ImportError as e:
+            raise ImportError("OpenTelemetrySink requires the opentelemetry-api package: pip install opentelemetry-sdk") from e
+        self.tracer = tracer or trace.get_tracer("multi-agent-playground")
+
+    def emit(self, event, **data):
+        if event != "llm_call":
+            return
+        from opentelemetry.trace import Status, StatusCode
+
+        start_time = int(data["start_ts"] * 1e9)
+        attributes = {
+            "gen_ai.operation.name": "chat",
+            "gen_ai.request.model": data["model"],
+            "gen_ai.usage.input_tokens": data["prompt_tokens"],
+            "gen_ai.usage.output_tokens": data["completion_tokens"],
+            "mas.phase": data["phase"],
+            "mas.call_kind": data["kind"],
+            "mas.attempt": data["attempt"],
+            "mas.cached_tokens": data["cached_tokens"],
+            "mas.cache_hit": data["cache_hit"],
+            "mas.ttft_s": data["ttft_s"],
+            "mas.parse_s": data["parse_s"],
+            "mas.outcome": data["outcome"],
+        }
+        span = self.tracer.start_span(f"llm {data['phase']}", start_time=start_time, attributes={key: value for key, value in attributes.items() if value is not None})
+        if data["outcome"] != "ok":
+            span.set_status(Status(StatusCode.ERROR, data["error"]))
+        span.end(end_time=start_time + int(data["wall_s"] * 1e9))
+
+
+class StreamlitSink(EventSink):
+    # Renders the events of a run on the page. The run itself goes on in a background job (src/jobs.py), which shows
+    # the spinner text and the streamed message; follow_job replays the recorded events through this sink
+    def __init__(self, st, sidebar_placeholder, st_tools=None):
+        self.st = st
+        self.sidebar_placeholder = sidebar_placeholder
+        self.st_tools = st_tools or StreamlitTools()
+
+    def emit(self, event, **data):
+        if event == "plan_created":
+            self._update_state(data["state"])
+        elif event == "message":
+            if not data["streamed"]:
+                self.st.markdown(data["content"], unsafe_allow_html=True)
+            self._update_state(data["state"])
+            # The "about to run" message and the agent's output belong together, so no divider between them
+            if data["phase"] != "input":
+                self.st.markdown(DIVIDER_HTML, unsafe_allow_html=True)
+
+    def _update_state(self, state):
+        self.st.session_state.plan = state.Plan
+        self.st.session_state.st_memory = state.Short_Term_Memory
+        self.st.session_state.lt_memory = state.Long_Term_Memory
+        self.st_tools.update_sidebar(state.Plan, self.st, self.sidebar_placeholder)
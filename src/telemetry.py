@@ -0,0 +1,66 @@
+import contextlib, time
+
+# Per-call instrumentation. MAS_orchestrator wraps every LLM call in a CallTrace, which emits one "llm_call" event
+# through the orchestrator's sink when the call ends:
+#   phase, kind (parse/create), model, attempt, start_ts, wall_s, ttft_s, parse_s,
+#   prompt_tokens, completion_tokens, cached_tokens, cache_hit, outcome ("ok" or the exception name), error
+# ttft_s is set for streamed calls only, parse_s only when the client exposes raw responses (the Azure OpenAI
+# clients do, the mock and cache wrappers do not). JsonlSink writes the events to a file and OpenTelemetrySink
+# turns them into spans.
+
+
+class CallTrace:
+    def __init__(self, sink, phase, kind, model, attempt=1):
+        self.sink = sink
+        self.data = {
+            "phase": phase,
+            "kind": kind,
+            "model": model,
+            "attempt": attempt,
+            "start_ts": None,
+            "wall_s": None,
+            "ttft_s": None,
+            "parse_s": None,
+            "prompt_tokens": None,
+            "completion_tokens": None,
+            "cached_tokens": None,
+            # Served from the local response cache (src/cache.py), not by the endpoint
+            "cache_hit": False,
+            "outcome": "ok",
+            "error": None,
+        }
+
+    def __enter__(self):
+        self.data["start_ts"] = time.time()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.data["wall_s"] = round(time.perf_counter() - self.started, 6)
+        if exc_type is not None:
+            self.data["outcome"] = exc_type.__name__
+            self.data["error"] = str(exc)
+        self.sink.emit("llm_call", **self.data)
+        return False
+
+    def first_token(self):
+        if self.data["ttft_s"] is None:
+            self.data["ttft_s"] = round(time.perf_counter() - self.started, 6)
+
+    def served_from_cache(self, response):
+        if getattr(response, "cached", False):
+            self.data["cache_hit"] = True
+
+    @contextlib.contextmanager
+    def parsing(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.data["parse_s"] = round(time.perf_counter() - started, 6)
+
+    def set_usage(self, usage):
+        details = getattr(usage, "prompt_tokens_details", None)
+        self.data["prompt_tokens"] = usage.prompt_tokens
+        self.data["completion_tokens"] = usage.completion_tokens
+        self.data["cached_tokens"] = (getattr(details, "cached_tokens", None) or 0) if details is not None else 0
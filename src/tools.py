@@ -1,5 +1,5 @@
 import json, base64
-import streamlit.components.v1 as components
+from html import escape
 
 class StreamlitTools:
     def __init__(self):
@@ -14,35 +14,37 @@ class StreamlitTools:
         }
         self.spinning_wheel_gif = "https://cdn.pixabay.com/animation/2023/10/10/13/27/13-27-45-28_512.gif"
 
+        # Incremental sidebar: the CSS is written once per page and every task card gets its own placeholder, which is
+        # re-rendered only when that card's HTML changed since the last step
+        self.card_placeholders = None
+        self.rendered_cards = None
+
     def generate_sidebar(self, plan_json):
-        html = self._generate_html_header()
-        tasks = self._load_tasks(plan_json)
-        sorted_tasks = self._sort_tasks(tasks)
-        task_counter = 1
+        # The whole sidebar as one HTML document
+        return self._generate_html_header() + '<div class="sidebar">' + "".join(self.generate_task_cards(plan_json)) + "</div>"
 
-        for task_key in sorted_tasks:
-            task = self._find_task(tasks, task_key)
+    def generate_task_cards(self, plan_json):
+        cards = []
+        for task_counter, task in enumerate(self._load_tasks(plan_json), start=1):
             task_name = task.get("Task", "Unnamed Task")
-            subtasks = task.get("Sub_Tasks", [])
+            subtasks = task.get("Sub_Tasks") or []
             subtasks_statuses = [subtask.get("Subtask_Status", "") for subtask in subtasks]
             task_status = task.get("Task_Status", "Pending")
             task_banner_color = self._determine_task_banner_color(task_status)
             task_status_color = self._determine_task_status_color(subtasks_statuses)
+            cards.append(self._compact_html(self._generate_task_card(task_counter, task_banner_color, task_status_color, task_name, subtasks)))
+        return cards
 
-            html += self._generate_task_card(task_counter, task_banner_color, task_status_color, task_name, subtasks)
-            task_counter += 1
-
-        html += "</div>"
-        return html
+    def _compact_html(self, text):
+        # No indentation or blank lines, so markdown renders the HTML as is instead of as a code block
+        return "\n".join(line.strip() for line in text.splitlines() if line.strip())
 
     def _generate_html_header(self):
         return """
-        <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
         <link rel="stylesheet" href="https://fonts.googleapis.com/css2?family=Inter:wght@400;700&display=swap">
         <style>
-        .sidebar { width: 300px; height: 100vh; padding: 20px; box-sizing: border-box; overflow-y: auto; font-family: 'Inter', sans-serif; background-color: transparent; }
-        .sidebar-title { font-size: 24px; font-weight: bold; text-align: center; margin-bottom: 20px; background-color: transparent; }
-        .task-card { background-color: #FFFFFF; border-radius: 8px; box-shadow: 0 2px 8px rgba(0,0,0,0.1); margin-bottom: 20px; transition: transform 0.3s; display: flex; flex-direction: column; }
+        .sidebar { font-family: 'Inter', sans-serif; background-color: transparent; }
+        .task-card { font-family: 'Inter', sans-serif; background-color: #FFFFFF; color: #31333F; border-radius: 8px; box-shadow: 0 2px 8px rgba(0,0,0,0.1); margin-bottom: 20px; transition: transform 0.3s; display: flex; flex-direction: column; }
         .task-card:hover { transform: translateY(-5px); }
         .task-banner { padding: 8px; text-align: center; font-size: 14px; font-weight: bold; border-radius: 8px 8px 0 0; }
         .task-content { padding: 15px; flex: 1; display: flex; flex-direction: column; }
@@ -57,26 +59,19 @@ class StreamlitTools:
         .status { width: 12px; height: 12px; border-radius: 50%; display: inline-block; margin-right: 8px; }
         .status-gif { width: 24px; height: 24px; margin-right: 8px; }
         .tooltip { position: relative; display: block; }
-        .tooltip .tooltiptext { visibility: hidden; width: 220px; background-color: #555; color: #fff; text-align: left; border-radius: 6px; padding: 8px; position: absolute; z-index: 1; left: 105%; top: 50%; transform: translateY(-50%); opacity: 0; transition: opacity 0.3s; }
+        .tooltip .tooltiptext { visibility: hidden; width: 220px; background-color: #555; color: #fff; text-align: left; border-radius: 6px; padding: 8px; position: absolute; z-index: 1; left: 0; top: 100%; opacity: 0; transition: opacity 0.3s; font-size: 11px; }
         .tooltip:hover .tooltiptext { visibility: visible; opacity: 1; }
-        .sidebar::-webkit-scrollbar { width: 8px; }
-        .sidebar::-webkit-scrollbar-track { background: #f1f1f1; border-radius: 4px; }
-        .sidebar::-webkit-scrollbar-thumb { background: #1B4F72; border-radius: 4px; }
         .task-footer { font-size: 10px; text-align: center; padding: 8px; background-color: #90EE90; border-radius: 0 0 8px 8px; }
         </style>
-        <div class="sidebar">
         """
 
     def _load_tasks(self, plan_json):
+        # Accepts the typed Plan carried in the run state as well as its JSON form
+        if not isinstance(plan_json, str):
+            return plan_json.model_dump()["Tasks"]
         plan_json1 = json.loads(plan_json)
         return plan_json1.get("Tasks", [])
 
-    def _sort_tasks(self, tasks):
-        return [task['Task'] for task in tasks if 'Task' in task]
-
-    def _find_task(self, tasks, task_key):
-        return next((task for task in tasks if task['Task'] == task_key), {})
-
     def _determine_task_banner_color(self, task_status):
         if task_status == "Successful":
             return "#28B463"  # Green
@@ -96,6 +91,8 @@ class StreamlitTools:
             return self.status_colors.get("Pending", "#FFC107")  # Yellow
 
     def _generate_task_card(self, task_counter, task_banner_color, task_status_color, task_name, subtasks):
+        # Every name and text in the card comes from the model and is rendered with unsafe_allow_html, so all of it is escaped
+        task_name = escape(task_name or "Unnamed Task")
         html = f"""
             <div class="task-card">
                 <div class="task-banner" style="background-color: {task_banner_color};">Task {task_counter}</div>
@@ -107,9 +104,9 @@ class StreamlitTools:
                     <ul class="subtasks">
         """
         for subtask in subtasks:
-            subtask_name = subtask.get("Sub_Task", "Unnamed Subtask")
-            agent_name = subtask.get("Agent", "No Agent")
-            function = subtask.get("Agent_Function", "No Function")
+            subtask_name = escape(subtask.get("Sub_Task") or "Unnamed Subtask")
+            agent_name = escape(subtask.get("Agent") or "No Agent")
+            function = escape(subtask.get("Agent_Function") or "No Function")
             subtask_status = subtask.get("Subtask_Status", "")
             status_html = self._determine_status_html(subtask_status)
             tooltip_content = self._generate_tooltip_content(subtask, agent_name, function)
@@ -127,9 +124,11 @@ class StreamlitTools:
         html += """
                 </ul>
         """
+        # The footer shows the observation of the last subtask; a task without subtasks has none
+        observation = subtasks[-1].get('Sub_Task_Output_Observation') if subtasks else None
         html += f"""
                     </div>
-                        <div class="task-footer"><strong>Memory</strong><br>{subtask.get('Sub_Task_Output_Observation', 'N/A')}</div>
+                        <div class="task-footer"><strong>Memory</strong><br>{escape(observation or 'N/A')}</div>
                     </div>
         """
         return html
@@ -148,19 +147,29 @@ class StreamlitTools:
         return f"""
             <strong>Agent:</strong> {agent_name}<br>
             <strong>Function:</strong> {function}<br>
-            <strong>Output:</strong> {subtask.get('Sub_Task_Output', 'N/A')}<br>
-            <strong>Observation:</strong> {subtask.get('Sub_Task_Output_Observation', 'N/A')}
+            <strong>Output:</strong> {escape(subtask.get('Sub_Task_Output') or 'N/A')}<br>
+            <strong>Observation:</strong> {escape(subtask.get('Sub_Task_Output_Observation') or 'N/A')}
         """
     
     def update_sidebar(self, plan_json, st, sidebar_placeholder):
-        if st.session_state.plan:
-            sidebar_html = self.generate_sidebar(plan_json)
-            with sidebar_placeholder:
-                components.html(sidebar_html, height=1000, scrolling=False)
-        else:
+        if not st.session_state.plan:
+            self.card_placeholders = None
             with sidebar_placeholder:
                 st.write("The plan will appear here once generated.")
-    
+            return
+
+        cards = self.generate_task_cards(plan_json)
+        if self.card_placeholders is None or len(self.card_placeholders) != len(cards):
+            # First render, or the planner changed the number of tasks: lay the sidebar out again
+            container = sidebar_placeholder.container()
+            container.markdown(self._compact_html(self._generate_html_header()), unsafe_allow_html=True)
+            self.card_placeholders = [container.empty() for _ in cards]
+            self.rendered_cards = [None] * len(cards)
+        for index, card in enumerate(cards):
+            if card != self.rendered_cards[index]:
+                self.card_placeholders[index].markdown(card, unsafe_allow_html=True)
+                self.rendered_cards[index] = card
+
 class GeneralTools:
     def __init__(self):
         pass
@@ -0,0 +1,45 @@
+import asyncio
+
+from src.cache import AsyncCachedClient, CachedClient, ResponseCache
+from src.mas import AsyncMAS_orchestrator, MAS_orchestrator
+from src.mock_llm import AsyncMockClient, MockClient
+from src.scheduler import TokenScheduler
+from src.sinks import EventSink
+import src.pydantic_models as pydantic_models
+
+QUERY = ("Retail", "Price comparison", "Find the lowest price for an Xbox")
+
+
+class StreamingSink(EventSink):
+    # Asks for streamed narration, like the app's job sink
+    def message_stream(self):
+        return lambda text, done=False: None
+
+
+def test_replayed_streamed_run_spends_no_tokens(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    client = CachedClient(MockClient(seed=0), cache, mode="record")
+    recorded = MAS_orchestrator(client, "mock", pydantic_models, sink=StreamingSink(), stream_messages=True).run(*QUERY)
+    assert recorded["status"] == "completed" and recorded["tokens"] > 0
+
+    scheduler = TokenScheduler(1_000_000)
+    replay = CachedClient(None, cache, mode="replay")
+    replayed = MAS_orchestrator(replay, "mock", pydantic_models, sink=StreamingSink(), stream_messages=True, scheduler=scheduler).run(*QUERY)
+    assert replayed["status"] == "completed"
+    assert replayed["tokens"] == 0
+    assert replay.misses == 0
+    # Every reservation was given back in full
+    assert scheduler.available == scheduler.tokens_per_minute
+
+
+def test_replayed_streamed_async_run_spends_no_tokens(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    client = AsyncCachedClient(AsyncMockClient(seed=0), cache, mode="record")
+    recorded = asyncio.run(AsyncMAS_orchestrator(client, "mock", pydantic_models, sink=StreamingSink(), stream_messages=True).run(*QUERY))
+    assert recorded["status"] == "completed" and recorded["tokens"] > 0
+
+    replay = AsyncCachedClient(None, cache, mode="replay")
+    replayed = asyncio.run(AsyncMAS_orchestrator(replay, "mock", pydantic_models, sink=StreamingSink(), stream_messages=True).run(*QUERY))
+    assert replayed["status"] == "completed"
+    assert replayed["tokens"] == 0
+    assert replay.misses == 0
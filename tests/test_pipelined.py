@@ -0,0 +1,46 @@
+import asyncio, threading, time
+
+from src.mas import AsyncMAS_orchestrator, MAS_orchestrator
+from src.mock_llm import AsyncMockClient, MockClient
+from src.sinks import EventSink
+import src.pydantic_models as pydantic_models
+
+QUERY = ("Retail", "Price comparison", "Find the lowest price for an Xbox")
+
+
+def narration_threads():
+    return sum(thread.name.startswith("mas-narration") for thread in threading.enumerate())
+
+
+def test_pipelined_runs_leave_no_narration_worker_behind():
+    for _ in range(3):
+        mas_orchestrator = MAS_orchestrator(MockClient(seed=0), "mock", pydantic_models, pipelined=True)
+        assert mas_orchestrator.run(*QUERY)["status"] == "completed"
+        assert mas_orchestrator.message_executor is None
+    assert narration_threads() == 0
+
+
+class MessageSink(EventSink):
+    def __init__(self):
+        self.messages = []
+
+    def emit(self, event, **data):
+        if event == "message":
+            # The mock's filler text depends on the order of its calls, the phases do not
+            self.messages.append(data["phase"])
+
+
+def run_async(pipelined):
+    sink = MessageSink()
+    mas_orchestrator = AsyncMAS_orchestrator(AsyncMockClient(latency=0.05, seed=0), "mock", pydantic_models, sink=sink, pipelined=pipelined)
+    started = time.perf_counter()
+    result = asyncio.run(mas_orchestrator.run(*QUERY))
+    return result, time.perf_counter() - started, sink.messages
+
+
+def test_async_pipelined_narration_overlaps_the_conductor_in_order():
+    sequential, sequential_s, sequential_messages = run_async(pipelined=False)
+    pipelined, pipelined_s, pipelined_messages = run_async(pipelined=True)
+    assert sequential["status"] == pipelined["status"] == "completed"
+    assert pipelined_messages == sequential_messages
+    assert pipelined_s < 0.9 * sequential_s
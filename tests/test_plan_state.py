@@ -0,0 +1,34 @@
+from src.plan_state import apply_plan_delta, dependency_outputs, merge_subtask_results, next_subtask, plan_completed, ready_subtasks
+from src.pydantic_models import AgentInput, AgentOutput, Plan, PlanDelta, SubTask, SubTaskResult, SubTaskUpdate, Task
+from src.tools import StreamlitTools
+
+
+def plan_with_null_subtasks(status=None):
+    # The model may send a task's Sub_Tasks as null; it passes the schema
+    return Plan(Tasks=[
+        Task(Task="Task 1", Sub_Tasks=None),
+        Task(Task="Task 2", Sub_Tasks=[SubTask(Sub_Task="Subtask 2.1", Agent="A", Agent_Function="f", Subtask_Status=status)]),
+    ], Overall_execution_of_the_plan="In Progress")
+
+
+def test_null_subtasks_are_read_as_none():
+    plan = plan_with_null_subtasks()
+    assert not plan_completed(plan)
+    assert [subtask.Sub_Task for _, subtask in ready_subtasks(plan)] == ["Subtask 2.1"]
+    assert next_subtask(plan)[1].Sub_Task == "Subtask 2.1"
+    assert dependency_outputs(plan, plan.Tasks[1].Sub_Tasks[0]) == {}
+    assert plan_completed(plan_with_null_subtasks("Successful"))
+
+
+def test_null_subtasks_in_updates_and_rendering():
+    plan = plan_with_null_subtasks()
+    delta = PlanDelta(Sub_Task_Updates=[SubTaskUpdate(Task="Task 1", Sub_Task="Subtask 2.1", Subtask_Status="Successful")])
+    assert plan_completed(apply_plan_delta(plan, delta))
+    result = SubTaskResult(
+        Agent_Input=AgentInput(agent_input="in", Agent="A", Agent_Function="f"),
+        Agent_Output=AgentOutput(agent_output="out", Agent="A", Agent_Function="f"),
+        Sub_Task_Output_Observation="done",
+        Subtask_Status="Successful",
+    )
+    assert merge_subtask_results(plan, [("Task 2", "Subtask 2.1", result)]).Overall_execution_of_the_plan == "Completed"
+    assert len(StreamlitTools().generate_task_cards(plan)) == 2
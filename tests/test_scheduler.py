@@ -0,0 +1,37 @@
+import httpx
+from openai import APITimeoutError
+
+from src.mas import MAS_orchestrator
+from src.mock_llm import MockClient
+from src.resilience import RetryPolicy
+from src.scheduler import TokenScheduler
+import src.pydantic_models as pydantic_models
+
+
+class TimingOutClient(MockClient):
+    # Every planner call times out
+    def __init__(self):
+        super().__init__()
+        self.beta.chat.completions.parse = self._timeout
+        self.attempts = 0
+
+    def _timeout(self, **kwargs):
+        self.attempts += 1
+        raise APITimeoutError(request=httpx.Request("POST", "http://localhost"))
+
+
+def test_settle_without_usage_returns_the_reservation():
+    scheduler = TokenScheduler(10_000)
+    reserved = scheduler.acquire(4_000)
+    assert scheduler.available <= 6_000 + 1
+    scheduler.settle("plan", "parse", reserved, None, None)
+    assert scheduler.available == 10_000
+
+
+def test_failed_attempts_release_their_reservations():
+    scheduler = TokenScheduler(100_000)
+    client = TimingOutClient()
+    mas_orchestrator = MAS_orchestrator(client, "mock", pydantic_models, scheduler=scheduler, retry_policy=RetryPolicy(max_attempts=3, base_delay=0))
+    assert mas_orchestrator.get_initial_plan("Retail", "Pricing", "Find the lowest price") is None
+    assert client.attempts == 3
+    assert scheduler.available == scheduler.tokens_per_minute